@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from match_store import MatchStore
+from poisson_model import PoissonPerformanceModel
+from dixon_coles import DixonColesModel, DEFAULT_XI
+from predictor import PredictionEngine, DATA_FILE, MODEL_FORM_MATCHES
+from score_grid import DEFAULT_MAX_GOALS, grid_markets, score_matrices
+
+MODELS = ('form', 'poisson', 'dixon_coles')
+
+
+class WalkForwardBacktest:
+    """
+    Replays the dataset in date order and scores the model's 1X2
+    probabilities for every match using only results from earlier dates.
+
+    Team state (the last N results for the form model, home/away goal
+    totals for the Poisson model) lives in per-team numpy arrays that are
+    updated after each matchday, so nothing is recomputed from the full
+    history. A date's fixtures are predicted together with the engine's
+    vectorised grid code (score_matrices + grid_markets), and use the same
+    lambda formulas as PredictionEngine and PoissonPerformanceModel, so a
+    backtest prediction matches predict_match with Window(as_of=<match date>).
+    """
+    def __init__(self, store, model='form', max_goals=DEFAULT_MAX_GOALS,
+                 form_matches=MODEL_FORM_MATCHES, min_history=1, xi=DEFAULT_XI):
+        """
+        Args:
+            store (MatchStore): Matches to replay.
+            model (str): "form" (the engine's recent-form lambdas),
+                "poisson" (season-long home/away averages) or "dixon_coles"
+                (refitted before every matchday, warm started from the
+                previous day's fit).
+            max_goals (int): Goals per side covered by the score grid.
+            form_matches (int): Matches in the form model's rolling window.
+            min_history (int): Fixtures where either team has played fewer
+                earlier matches than this are skipped (cold starts).
+            xi (float): Dixon-Coles time decay per day.
+        """
+        if model not in MODELS:
+            raise ValueError(f"Unknown model {model!r}, expected one of {MODELS}")
+        self.store = store
+        self.model = model
+        self.max_goals = max_goals
+        self.form_matches = form_matches
+        self.min_history = min_history
+        self.xi = xi
+        self._fit = None
+
+    def _fixtures(self):
+        df = self.store.played()
+        df = df[df['date'].notna()]
+        # Same ordering as TeamWindowIndex: by day, file order within a day
+        df = df.iloc[np.argsort(df['date'].values.astype('datetime64[D]'), kind='stable')]
+        n = len(df)
+        return {
+            "home": df['homeId'].to_numpy(dtype=np.int64),
+            "away": df['awayId'].to_numpy(dtype=np.int64),
+            "home_goals": df['homeScore'].to_numpy(dtype=np.int64),
+            "away_goals": df['awayScore'].to_numpy(dtype=np.int64),
+            "days": df['date'].values.astype('datetime64[D]'),
+            "seasons": df['season'].to_numpy() if 'season' in df.columns else np.full(n, '', dtype=object),
+        }, len(self.store.registry)
+
+    def run(self):
+        """
+        Returns:
+            dict: Overall and per-season metrics (see summarize), plus the
+            number of fixtures scored and skipped and the run time.
+        """
+        started = time.perf_counter()
+        fx, n_teams = self._fixtures()
+        state = _TeamState(n_teams, self.form_matches)
+        self._fit = None
+
+        probs = np.full((len(fx["home"]), 3), np.nan)
+        # Fixtures sharing a date are independent of each other: predict the
+        # whole group from the state before it, then fold its results in
+        day_starts = np.flatnonzero(np.r_[True, fx["days"][1:] != fx["days"][:-1]])
+        day_ends = np.r_[day_starts[1:], len(fx["home"])]
+        for start, end in zip(day_starts, day_ends):
+            home = fx["home"][start:end]
+            away = fx["away"][start:end]
+            lambdas, ok = self._lambdas(fx, state, start, end)
+            if ok.any():
+                if self.model == 'dixon_coles':
+                    matrices = self._fit.score_matrices(lambdas[0][ok], lambdas[1][ok], self.max_goals)
+                else:
+                    matrices = score_matrices(lambdas[0][ok], lambdas[1][ok], self.max_goals)
+                markets = grid_markets(matrices)
+                idx = np.arange(start, end)[ok]
+                probs[idx, 0] = markets['home_win']
+                probs[idx, 1] = markets['draw']
+                probs[idx, 2] = markets['away_win']
+            state.update(home, away, fx["home_goals"][start:end], fx["away_goals"][start:end])
+
+        outcomes = np.sign(fx["home_goals"] - fx["away_goals"])
+        scored = ~np.isnan(probs[:, 0])
+        summary = summarize(probs[scored], outcomes[scored])
+        summary["by_season"] = {
+            season: summarize(probs[scored & (fx["seasons"] == season)],
+                              outcomes[scored & (fx["seasons"] == season)])
+            for season in sorted(set(fx["seasons"]))
+        }
+        summary.update({
+            "model": self.model,
+            "skipped": int((~scored).sum()),
+            "seconds": round(time.perf_counter() - started, 3)
+        })
+        return summary
+
+    def _lambdas(self, fx, state, start, end):
+        """
+        Lambdas for the fixtures [start, end) (one date) from the state
+        before that date, and a mask of the fixtures that can be scored.
+        """
+        home = fx["home"][start:end]
+        away = fx["away"][start:end]
+        played = state.played
+        ok = (played[home] >= self.min_history) & (played[away] >= self.min_history)
+        if self.model == 'form':
+            return PredictionEngine.form_expected_goals(state.form_rates(home), state.form_rates(away)), ok
+
+        if self.model == 'dixon_coles':
+            if not ok.any():
+                return (np.zeros(len(home)), np.zeros(len(home))), ok
+            # Everything before this date; the previous fit is a close start
+            self._fit = DixonColesModel.fit(
+                fx["home"][:start], fx["away"][:start],
+                fx["home_goals"][:start], fx["away_goals"][:start], fx["days"][:start],
+                self.xi, fx["days"][start], warm_start=self._fit, team_names=self.store.registry.names
+            )
+            return self._fit.expected_goals_by_id(home, away), ok
+
+        # Same as get_performance_stats: both sides need a match at that venue
+        ok &= (state.home_played[home] > 0) & (state.away_played[away] > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lambdas = PoissonPerformanceModel.expected_goals(
+                state.home_goals_for[home] / state.home_played[home],
+                state.home_goals_against[home] / state.home_played[home],
+                state.away_goals_for[away] / state.away_played[away],
+                state.away_goals_against[away] / state.away_played[away]
+            )
+        return lambdas, ok
+
+
+class _TeamState:
+    """
+    Running per-team counters indexed by team id. The form model's rolling
+    window is a ring buffer with running goal sums, so a result costs O(1).
+    """
+    def __init__(self, n_teams, form_matches):
+        self.form_matches = form_matches
+        self.played = np.zeros(n_teams, dtype=np.int64)
+        self.ring = np.zeros((n_teams, form_matches, 2), dtype=np.int64)
+        self.ring_sums = np.zeros((n_teams, 2), dtype=np.int64)
+        self.home_played = np.zeros(n_teams, dtype=np.int64)
+        self.home_goals_for = np.zeros(n_teams, dtype=np.int64)
+        self.home_goals_against = np.zeros(n_teams, dtype=np.int64)
+        self.away_played = np.zeros(n_teams, dtype=np.int64)
+        self.away_goals_for = np.zeros(n_teams, dtype=np.int64)
+        self.away_goals_against = np.zeros(n_teams, dtype=np.int64)
+
+    def form_rates(self, teams):
+        """
+        Goals scored/conceded per match over each team's last N results,
+        shape (len(teams), 2); NaN for teams without history.
+        """
+        count = np.minimum(self.played[teams], self.form_matches)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.ring_sums[teams] / count[:, None]
+
+    def update(self, home, away, home_goals, away_goals):
+        # A team plays at most once per date, so fancy-indexed writes don't collide
+        self.home_played[home] += 1
+        self.home_goals_for[home] += home_goals
+        self.home_goals_against[home] += away_goals
+        self.away_played[away] += 1
+        self.away_goals_for[away] += away_goals
+        self.away_goals_against[away] += home_goals
+
+        teams = np.concatenate([home, away])
+        result = np.stack([np.concatenate([home_goals, away_goals]),
+                           np.concatenate([away_goals, home_goals])], axis=1)
+        slot = self.played[teams] % self.form_matches
+        self.ring_sums[teams] += result - self.ring[teams, slot]
+        self.ring[teams, slot] = result
+        self.played[teams] += 1
+
+
+def summarize(probs, outcomes):
+    """
+    Scores 1X2 forecasts.
+
+    Args:
+        probs (np.ndarray): Shape (n, 3): home win, draw, away win probabilities.
+        outcomes (np.ndarray): Shape (n,): 1 home win, 0 draw, -1 away win.
+
+    Returns:
+        dict: Mean log-loss, Brier score (summed over the three outcomes),
+        ranked probability score, accuracy of the most likely outcome, and
+        the number of matches scored.
+    """
+    n = len(outcomes)
+    if not n:
+        return {"matches": 0, "log_loss": None, "brier": None, "rps": None, "accuracy": None}
+
+    actual = np.zeros((n, 3))
+    actual[np.arange(n), 1 - outcomes] = 1.0
+    picked = probs[np.arange(n), 1 - outcomes]
+    # RPS over the ordered outcomes home / draw / away
+    cumulative_gap = np.cumsum(probs, axis=1)[:, :2] - np.cumsum(actual, axis=1)[:, :2]
+    return {
+        "matches": int(n),
+        "log_loss": round(float(-np.log(np.clip(picked, 1e-15, 1.0)).mean()), 4),
+        "brier": round(float(((probs - actual) ** 2).sum(axis=1).mean()), 4),
+        "rps": round(float((cumulative_gap ** 2).sum(axis=1).mean() / 2), 4),
+        "accuracy": round(float((probs.argmax(axis=1) == 1 - outcomes).mean()), 4)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the match predictions.")
+    parser.add_argument('--data', default=DATA_FILE, help="Matches JSON file to replay.")
+    parser.add_argument('--model', choices=MODELS, default='form')
+    parser.add_argument('--max-goals', type=int, default=DEFAULT_MAX_GOALS)
+    parser.add_argument('--form-matches', type=int, default=MODEL_FORM_MATCHES)
+    parser.add_argument('--min-history', type=int, default=1,
+                        help="Skip fixtures where a team has fewer earlier matches than this.")
+    parser.add_argument('--xi', type=float, default=DEFAULT_XI, help="Dixon-Coles time decay per day.")
+    parser.add_argument('--json', action='store_true', help="Print the full result as JSON.")
+    args = parser.parse_args(argv)
+
+    store = MatchStore.from_file(os.path.abspath(args.data))
+    result = WalkForwardBacktest(
+        store, args.model, args.max_goals, args.form_matches, args.min_history, args.xi
+    ).run()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return result
+
+    print(f"Model: {result['model']}  matches: {result['matches']}  skipped: {result['skipped']}  "
+          f"({result['seconds']}s)")
+    print(f"{'season':<12}{'matches':>8}{'log-loss':>10}{'brier':>8}{'rps':>8}{'acc':>8}")
+    rows = list(result['by_season'].items()) + [('all', result)]
+    for season, m in rows:
+        if not m['matches']:
+            continue
+        print(f"{season:<12}{m['matches']:>8}{m['log_loss']:>10.4f}{m['brier']:>8.4f}"
+              f"{m['rps']:>8.4f}{m['accuracy']:>8.3f}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
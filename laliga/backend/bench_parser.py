@@ -0,0 +1,39 @@
+import glob
+import os
+import time
+from scraper import HTML_DIR, parse_html_content, read_page
+
+def time_backend(content, season_str, backend, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matches = parse_html_content(content, season_str, backend=backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, matches
+
+def run_benchmark(repeat=3):
+    """
+    Times parse_html_content per saved season page with the fast scanner and
+    the BeautifulSoup path, and checks both produce the same matches.
+    """
+    paths = sorted(glob.glob(os.path.join(HTML_DIR, '*.html*')))
+    if not paths:
+        print(f"No saved pages in {HTML_DIR}")
+        return
+
+    print(f"{'season':<12}{'matches':>8}{'fast ms':>10}{'bs4 ms':>10}{'speedup':>9}  same")
+    total_fast = total_bs4 = 0.0
+    for path in paths:
+        season_str = os.path.basename(path).split('.html')[0]
+        content, _ = read_page(path)
+        fast_s, fast_matches = time_backend(content, season_str, 'fast', repeat)
+        bs4_s, bs4_matches = time_backend(content, season_str, 'bs4', repeat)
+        total_fast += fast_s
+        total_bs4 += bs4_s
+        print(f"{season_str:<12}{len(fast_matches):>8}{fast_s * 1000:>10.1f}{bs4_s * 1000:>10.1f}"
+              f"{bs4_s / fast_s:>8.1f}x  {fast_matches == bs4_matches}")
+    print(f"{'total':<12}{'':>8}{total_fast * 1000:>10.1f}{total_bs4 * 1000:>10.1f}{total_bs4 / total_fast:>8.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
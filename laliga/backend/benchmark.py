@@ -0,0 +1,334 @@
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import scraper
+from match_columns import write_columns
+from predictor import PredictionEngine, DATA_FILE
+from scraper import HTML_DIR, parse_html_content, read_page
+from team_windows import Window
+
+# Stored results the current run is compared against (see --save-baseline).
+# Timings only mean something on the machine that recorded them, so the
+# file is local to each checkout (gitignored), never committed.
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# A metric this many times slower than the baseline counts as a regression
+REGRESSION_RATIO = 1.5
+# ...and is also worse by more than this (per unit), so jitter on already
+# fast calls isn't reported
+NOISE_FLOOR = {"_ms": 0.1, "_s": 0.02, "_mb": 1.0}
+# Each latency metric is timed in this many rounds; its p50 (the gated
+# figure) is the median of the round medians
+ROUNDS = 5
+# Calibration workload runs per calibration (median kept); calibrated at
+# the start and the end of a run
+CALIBRATION_RUNS = 9
+# Dataset sizes benchmarked, as multiples of the real dataset
+DEFAULT_SCALES = (1, 10, 100)
+# Parses per season page (best one is kept)
+PARSER_REPEAT = 5
+# Engine model benchmarked; the API serves dixon_coles (see main.py)
+DEFAULT_MODEL = 'dixon_coles'
+
+
+def percentiles(rounds):
+    """
+    p50 / p95 / p99 in milliseconds of rounds of durations in seconds (see
+    timed_rounds). p50 is the median of the round medians; p95 / p99 are
+    over all samples and only reported, not gated (see compare).
+    """
+    values = [np.array(samples) * 1000 for samples in rounds]
+    result = {"p50_ms": round(float(np.median([np.median(v) for v in values])), 4)}
+    pooled = np.concatenate(values)
+    result.update({f"p{p}_ms": round(float(np.percentile(pooled, p)), 4) for p in (95, 99)})
+    return result
+
+
+def timed(fn, repeat):
+    # Like timeit, keep the cyclic GC from landing in random samples
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return samples
+
+
+def timed_rounds(fn, repeat, rounds=ROUNDS):
+    return [timed(fn, repeat) for _ in range(rounds)]
+
+
+def calibrate():
+    """
+    Seconds for a fixed pure-Python + numpy workload (median of
+    CALIBRATION_RUNS after a warm-up run). Stored with the results so
+    timings from a slower or busier machine can be scaled before comparing
+    them with the baseline.
+    """
+    values = np.random.default_rng(0).random(200000)
+
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        np.sort(values)
+        json.dumps([{"id": i, "team": str(i)} for i in range(20000)])
+        return total
+
+    workload()
+    return float(np.median(timed(workload, CALIBRATION_RUNS)))
+
+
+def synthetic_matches(records, scale):
+    """
+    ``scale`` copies of the dataset played as parallel leagues: copy k
+    renames every team to "<team> #k", so the number of teams grows with
+    the scale while dates, seasons and per-team history stay realistic.
+    """
+    if scale == 1:
+        return records
+    seq_offset = 10 ** len(str(len(records)))
+    matches = []
+    for k in range(scale):
+        for m in records:
+            copy = dict(m)
+            if k:
+                prefix, seq = m['id'].rsplit('-', 1)
+                copy['id'] = f"{prefix}-{int(seq) + k * seq_offset}"
+                copy['homeTeam'] = f"{m['homeTeam']} #{k}"
+                copy['awayTeam'] = f"{m['awayTeam']} #{k}"
+            matches.append(copy)
+    return matches
+
+
+def write_dataset(records, directory):
+    """
+    Writes a matches JSON file plus its columnar copy, as the scraper does.
+    """
+    path = os.path.join(directory, 'matches.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+    write_columns(records, path)
+    return path
+
+
+def bench_engine(data_path, model, repeat):
+    """
+    Cold start, predict_match, get_team_form and get_performance_stats on
+    one dataset.
+    """
+    results = {}
+    cold = timed(lambda: PredictionEngine(data_path, model=model), max(1, repeat // 20))
+    results["cold_start_s"] = round(min(cold), 4)
+
+    tracemalloc.start()
+    engine = PredictionEngine(data_path, model=model)
+    results["cold_start_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    teams = engine.get_teams()
+    calls = repeat * ROUNDS
+    pairs = [tuple(rng.sample(teams, 2)) for _ in range(calls)]
+
+    def predict_uncached(pair):
+        # Drop the cache so every call does the full computation
+        engine._prediction_cache.clear()
+        engine.predict_match(*pair)
+
+    pair_iter = iter(pairs)
+    results["predict_match"] = percentiles(timed_rounds(lambda: predict_uncached(next(pair_iter)), repeat))
+    engine.predict_match(*pairs[0])
+    results["predict_match_cached"] = percentiles(timed_rounds(lambda: engine.predict_match(*pairs[0]), repeat))
+
+    team_iter = iter(rng.choice(teams) for _ in range(calls))
+    results["get_team_form"] = percentiles(
+        timed_rounds(lambda: engine.analyzer.get_team_form(next(team_iter), 5), repeat))
+
+    pair_iter = iter(pairs)
+    results["get_performance_stats"] = percentiles(
+        timed_rounds(lambda: engine.poisson_model.get_performance_stats(*next(pair_iter)), repeat))
+
+    # A new as-of date per call, so per-window tables/fits are rebuilt each time
+    days = engine.store.df['date'].dropna().sort_values().unique()
+    day_iter = iter(rng.choice(list(days[len(days) // 2:])) for _ in range(calls))
+    window_pairs = iter(pairs)
+    results["predict_match_as_of"] = percentiles(timed_rounds(
+        lambda: engine.predict_match(*next(window_pairs), Window(as_of=next(day_iter))), max(1, repeat // 10)))
+    return results
+
+
+def bench_parser(repeat):
+    """
+    parse_html_content (fast scanner) per saved season page, best of ``repeat``.
+    """
+    results = {}
+    for path in sorted(glob.glob(os.path.join(HTML_DIR, '*.html*'))):
+        season_str = os.path.basename(path).split('.html')[0]
+        content, _ = read_page(path)
+        best = min(timed(lambda: parse_html_content(content, season_str), repeat))
+        results[f"{season_str}_ms"] = round(best * 1000, 2)
+    results["total_ms"] = round(sum(results.values()), 2)
+    return {"parse_html_content": results}
+
+
+def bench_scraper(workdir):
+    """
+    Full scraper.main() from the local HTML cache into a scratch directory,
+    cold (no parsed cache) and incremental (nothing changed).
+    """
+    saved = scraper.OUTPUT_JSON_FILE, scraper.PARSED_CACHE_DIR
+    scraper.OUTPUT_JSON_FILE = os.path.join(workdir, 'matches-all-seasons.json')
+    scraper.PARSED_CACHE_DIR = os.path.join(workdir, 'parsed')
+    results = {}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, incremental in (("scraper_main_s", False), ("scraper_main_incremental_s", True)):
+                start = time.perf_counter()
+                scraper.main(incremental=incremental)
+                results[name] = round(time.perf_counter() - start, 3)
+    finally:
+        scraper.OUTPUT_JSON_FILE, scraper.PARSED_CACHE_DIR = saved
+    return results
+
+
+def run(scales=DEFAULT_SCALES, model=DEFAULT_MODEL, repeat=200):
+    """
+    Runs the whole suite.
+
+    Returns:
+        dict: Nested results; see flatten for the metric names.
+    """
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    results = {"model": model, "matches": len(records)}
+    calibration = calibrate()
+    workdir = tempfile.mkdtemp(prefix='laliga-bench-')
+    try:
+        for scale in scales:
+            print(f"Benchmarking {scale}x ({len(records) * scale} matches)...")
+            directory = os.path.join(workdir, f"{scale}x")
+            os.makedirs(directory)
+            data_path = write_dataset(synthetic_matches(records, scale), directory)
+            results[f"{scale}x"] = bench_engine(data_path, model, repeat)
+
+        print("Benchmarking parser and scraper...")
+        results.update(bench_parser(PARSER_REPEAT))
+        os.makedirs(os.path.join(workdir, 'scraper'))
+        results.update(bench_scraper(os.path.join(workdir, 'scraper')))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    # Averaged with a calibration at the start, so a machine that got busier
+    # or quieter during the run doesn't skew the scaling
+    results["calibration_s"] = round((calibration + calibrate()) / 2, 5)
+    return results
+
+
+def flatten(results, prefix=''):
+    """
+    Numeric metrics as {"10x.predict_match.p95_ms": value}. Every metric is
+    a duration or a size, so lower is better.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and key not in ('matches', 'calibration_s'):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    """
+    Prints every metric next to its baseline value. Timings are first
+    divided by how much slower the machine is than when the baseline was
+    recorded (the calibration_s ratio); memory figures are compared as is.
+    Tail latencies (p95 / p99) are printed but too noisy to gate on.
+
+    Returns:
+        list: Names of the gated metrics more than ``ratio`` times their
+        baseline and worse by more than the NOISE_FLOOR.
+    """
+    current = flatten(results)
+    previous = flatten(baseline)
+    speed = 1.0
+    if baseline.get("calibration_s") and results.get("calibration_s"):
+        speed = results["calibration_s"] / baseline["calibration_s"]
+        print(f"Machine speed vs baseline: {1 / speed:.2f}x (timings scaled by {1 / speed:.2f})")
+
+    regressions = []
+    print(f"{'metric':<48}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, value in current.items():
+        old = previous.get(name)
+        if old is None:
+            print(f"{name:<48}{'-':>12}{value:>12}")
+            continue
+        adjusted = value if name.endswith('_mb') else value / speed
+        change = adjusted / old if old else float('inf') if adjusted else 1.0
+        floor = next((v for suffix, v in NOISE_FLOOR.items() if name.endswith(suffix)), 0)
+        gated = not name.endswith(('.p95_ms', '.p99_ms'))
+        flag = '' if gated else '  (not gated)'
+        if gated and change > ratio and adjusted - old > floor:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<48}{old:>12}{value:>12}{change:>7.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the prediction and ingestion hot paths.")
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help="Comma-separated dataset multiples, e.g. 1,10,100.")
+    parser.add_argument('--model', choices=('form', 'dixon_coles'), default=DEFAULT_MODEL)
+    parser.add_argument('--repeat', type=int, default=200, help="Calls per latency metric.")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline.")
+    parser.add_argument('--ratio', type=float, default=REGRESSION_RATIO,
+                        help="Slowdown over the baseline reported as a regression.")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    results = run(scales, args.model, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(json.dumps(results, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(results, indent=2))
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("model") != results["model"]:
+        print(f"Warning: baseline was recorded with model {baseline.get('model')!r}")
+    regressions = compare(results, baseline, args.ratio)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.ratio}x")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
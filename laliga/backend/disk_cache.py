@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Entries kept on disk; the least recently used are dropped beyond this
+DISK_CACHE_ENTRIES = 200000
+# Inserts between two size checks (the check is a COUNT over the table)
+PRUNE_EVERY = 1000
+# SQLite caps the number of ? parameters per statement
+MAX_PARAMS = 500
+
+
+class DiskCache:
+    """
+    Persistent JSON-value cache in a SQLite file, shared by every process
+    on the host (WAL mode lets readers and a writer work concurrently).
+
+    It sits behind the engine's in-memory caches: it's only read on a
+    memory miss and written when something is computed, so a restarted or
+    newly forked worker finds earlier results instead of recomputing them.
+    Callers put everything that changes a result (data version, model
+    settings) into the key; stale entries are never read and age out
+    through the LRU eviction.
+    """
+    def __init__(self, path, max_entries=DISK_CACHE_ENTRIES):
+        """
+        Args:
+            path (str): SQLite file, created if needed.
+            max_entries (int): Size bound for the LRU eviction.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self._connect().execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads; one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        """
+        Returns:
+            dict: key -> value for the keys found (missing keys are left out).
+        """
+        found = {}
+        conn = self._connect()
+        keys = list(keys)
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+        if found:
+            try:
+                hits = list(found)
+                with conn:
+                    for start in range(0, len(hits), MAX_PARAMS):
+                        chunk = hits[start:start + MAX_PARAMS]
+                        conn.execute(f"UPDATE entries SET used = ? WHERE key IN ({','.join('?' * len(chunk))})",
+                                     [time.time()] + chunk)
+            except sqlite3.OperationalError:
+                # Another process holds the write lock; recency is best effort
+                pass
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items):
+        """
+        Stores (key, value) pairs in one transaction. Values must be JSON
+        serializable and come back equal (plain dicts, lists, numbers, str).
+        """
+        items = [(key, json.dumps(value), time.time()) for key, value in items]
+        if not items:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)", items)
+        except sqlite3.OperationalError as e:
+            # Losing a cache write only costs a recomputation later
+            print(f"Disk cache write failed: {e}")
+            return
+
+        with self._lock:
+            self._writes += len(items)
+            due = self._writes >= PRUNE_EVERY
+            if due:
+                self._writes = 0
+        if due:
+            self.prune()
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def prune(self):
+        """Drops the least recently used entries beyond max_entries."""
+        conn = self._connect()
+        try:
+            with conn:
+                count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute("DELETE FROM entries WHERE key IN "
+                                 "(SELECT key FROM entries ORDER BY used LIMIT ?)", (count - self.max_entries,))
+        except sqlite3.OperationalError as e:
+            print(f"Disk cache prune failed: {e}")
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
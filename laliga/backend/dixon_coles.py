@@ -0,0 +1,308 @@
+import numpy as np
+from score_grid import DEFAULT_MAX_GOALS, score_matrices
+
+# Time decay per day: a match a year old counts half as much as one today
+DEFAULT_XI = np.log(2) / 365
+# Fit stops once no log-parameter moves by more than this between sweeps
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 1000
+# Weight of one average pseudo-match added to every rating, so teams with
+# few (or only old) matches are pulled towards average instead of overfitting
+PRIOR_WEIGHT = 1.0
+# Range searched for the low-score correlation parameter
+RHO_BOUNDS = (-0.3, 0.3)
+
+
+def dixon_coles_matrices(lambda_home, lambda_away, rho, max_goals=DEFAULT_MAX_GOALS):
+    """
+    Score matrices (see score_grid.score_matrices) with the Dixon-Coles
+    adjustment of the 0-0, 1-0, 0-1 and 1-1 cells.
+
+    Args:
+        lambda_home (array): Home expected goals, shape (n,).
+        lambda_away (array): Away expected goals, shape (n,).
+        rho (float): Low-score dependence; negative values make 0-0 and
+            1-1 more likely and 1-0 / 0-1 less likely.
+        max_goals (int): Goals per side covered by each grid.
+    """
+    lambda_home = np.asarray(lambda_home, dtype=float)
+    lambda_away = np.asarray(lambda_away, dtype=float)
+    matrices = score_matrices(lambda_home, lambda_away, max_goals)
+    matrices[:, 0, 0] *= 1 - lambda_home * lambda_away * rho
+    matrices[:, 0, 1] *= 1 + lambda_home * rho
+    matrices[:, 1, 0] *= 1 + lambda_away * rho
+    matrices[:, 1, 1] *= 1 - rho
+    return matrices
+
+
+def _tau(home_goals, away_goals, lambda_home, lambda_away, rho):
+    tau = np.ones(len(home_goals))
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - lambda_home * lambda_away * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + lambda_home * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + lambda_away * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+    return tau
+
+
+class DixonColesModel:
+    """
+    Dixon-Coles team strengths: every team has an attack and a defence
+    rating and there is one home advantage, all on a log scale, so
+
+        λ_home = exp(home_advantage + attack[home] + defence[away])
+        λ_away = exp(attack[away] + defence[home])
+
+    plus the rho correction for low scores. Older matches are down-weighted
+    by exp(-xi * days ago).
+
+    The fit is a weighted maximum-likelihood estimate (with a weak prior
+    towards average ratings, see PRIOR_WEIGHT). The attack, defence
+    and home parameters are updated in turn with their closed-form optimum
+    given the others (each sweep is a handful of bincounts over the match
+    arrays), then rho is found with a 1-D search given the strengths.
+    Passing the previous fit as ``warm_start`` starts from its ratings,
+    so refitting after a matchday only needs a few sweeps.
+    """
+    def __init__(self, teams, attack, defence, home_advantage, rho, xi=DEFAULT_XI,
+                 reference_date=None, iterations=0, log_likelihood=None, team_ids=None):
+        self.teams = list(teams)
+        # Registry id of each rated team when fitted from ids, for expected_goals_by_id
+        self.team_ids = np.asarray(team_ids, dtype=np.int64) if team_ids is not None else None
+        self.attack = np.asarray(attack, dtype=float)
+        self.defence = np.asarray(defence, dtype=float)
+        self.home_advantage = float(home_advantage)
+        self.rho = float(rho)
+        self.xi = xi
+        self.reference_date = reference_date
+        self.iterations = iterations
+        self.log_likelihood = log_likelihood
+        self._team_pos = {team: i for i, team in enumerate(self.teams)}
+
+    @classmethod
+    def fit(cls, home, away, home_goals, away_goals, dates, xi=DEFAULT_XI, as_of=None,
+            warm_start=None, tol=TOLERANCE, max_iter=MAX_ITERATIONS, team_names=None):
+        """
+        Fits the model to a set of played matches.
+
+        Args:
+            home, away (array): Team names per match, or integer team ids
+                when ``team_names`` is given.
+            home_goals, away_goals (array): Final scores.
+            dates (array): Match dates (datetime64); undated matches are ignored.
+            xi (float): Time decay per day (0 weights every match equally).
+            as_of (datetime64 | str): Only matches before this date are used
+                and weights decay from it. Defaults to the latest match date.
+            warm_start (DixonColesModel): Previous fit to start from.
+            tol (float): Convergence threshold on the log-parameters.
+            max_iter (int): Maximum number of sweeps.
+            team_names (sequence): Name of every team id (e.g. a
+                TeamRegistry's names), to fit from ids without any
+                per-match name lookups.
+
+        Returns:
+            DixonColesModel: With no matches to fit (e.g. an as-of date
+            before the first match) every team gets average ratings and
+            the home advantage and rho of ``warm_start``.
+
+        Raises:
+            ValueError: If there are no matches and no warm_start.
+        """
+        days = np.asarray(dates, dtype='datetime64[D]')
+        keep = ~np.isnat(days)
+        if as_of is not None:
+            reference = np.datetime64(as_of, 'D')
+            keep &= days < reference
+        else:
+            reference = days[keep].max() if keep.any() else None
+        if not keep.any():
+            if warm_start is None:
+                raise ValueError("No matches to fit")
+            return cls([], [], [], warm_start.home_advantage, warm_start.rho, xi,
+                       str(reference) if reference is not None else None,
+                       team_ids=[] if team_names is not None else None)
+
+        home_goals = np.asarray(home_goals, dtype=float)[keep]
+        away_goals = np.asarray(away_goals, dtype=float)[keep]
+        age = (reference - days[keep]).astype(np.int64)
+        weights = np.exp(-xi * age)
+
+        if team_names is not None:
+            # Only the teams in these matches, in id order (= name order for
+            # registry ids) so the fit is the same as from names
+            home = np.asarray(home, dtype=np.int64)[keep]
+            away = np.asarray(away, dtype=np.int64)[keep]
+            used = np.unique(np.concatenate([home, away]))
+            teams = [team_names[i] for i in used]
+            team_ids = used
+            h = np.searchsorted(used, home)
+            a = np.searchsorted(used, away)
+        else:
+            home = np.asarray(home, dtype=object)[keep]
+            away = np.asarray(away, dtype=object)[keep]
+            teams = sorted(set(home) | set(away))
+            team_ids = None
+            team_pos = {team: i for i, team in enumerate(teams)}
+            h = np.array([team_pos[t] for t in home])
+            a = np.array([team_pos[t] for t in away])
+        n = len(teams)
+
+        # Multiplicative form: A = exp(attack), D = exp(defence), H = exp(home)
+        if warm_start is not None:
+            attack = np.array([warm_start.attack[warm_start._team_pos[t]] if t in warm_start._team_pos else 0.0
+                               for t in teams])
+            defence = np.array([warm_start.defence[warm_start._team_pos[t]] if t in warm_start._team_pos else 0.0
+                                for t in teams])
+            A, D, H = np.exp(attack), np.exp(defence), np.exp(warm_start.home_advantage)
+        else:
+            A, D, H = np.ones(n), np.ones(n), 1.0
+
+        # Weighted goals scored / conceded per team don't change between sweeps.
+        # The prior pseudo-match scores and concedes its expected goals, which
+        # also keeps a team that never scored from running off to -inf.
+        scored = np.bincount(h, weights * home_goals, n) + np.bincount(a, weights * away_goals, n)
+        conceded = np.bincount(a, weights * home_goals, n) + np.bincount(h, weights * away_goals, n)
+        mean_goals = (weights * (home_goals + away_goals)).sum() / (2 * weights.sum())
+        prior = PRIOR_WEIGHT * mean_goals
+        total_home_goals = (weights * home_goals).sum()
+
+        iterations = 0
+        for iterations in range(1, max_iter + 1):
+            previous = np.concatenate([np.log(A), np.log(D), [np.log(H)]])
+            A = (scored + prior) / (np.bincount(h, weights * H * D[a], n) + np.bincount(a, weights * D[h], n) + prior)
+            D = (conceded + prior) / (np.bincount(a, weights * H * A[h], n) + np.bincount(h, weights * A[a], n) + prior)
+            H = total_home_goals / (weights * A[h] * D[a]).sum()
+            # Only attack + defence is identified; centre attack on 0
+            scale = np.exp(np.log(A).mean())
+            A, D = A / scale, D * scale
+            current = np.concatenate([np.log(A), np.log(D), [np.log(H)]])
+            if np.abs(current - previous).max() < tol:
+                break
+
+        lambda_home = H * A[h] * D[a]
+        lambda_away = A[a] * D[h]
+        rho = cls._fit_rho(home_goals, away_goals, lambda_home, lambda_away, weights)
+        tau = _tau(home_goals, away_goals, lambda_home, lambda_away, rho)
+        # Up to the constant log(k!) terms
+        log_likelihood = float((weights * (
+            np.log(tau) + home_goals * np.log(lambda_home) - lambda_home
+            + away_goals * np.log(lambda_away) - lambda_away
+        )).sum())
+
+        return cls(teams, np.log(A), np.log(D), np.log(H), rho, xi,
+                   str(reference) if reference is not None else None, iterations, log_likelihood, team_ids)
+
+    @classmethod
+    def from_store(cls, store, window=None, xi=DEFAULT_XI, warm_start=None):
+        """
+        Fits the played matches of a MatchStore, optionally restricted to a
+        Window's as-of date and season range (its last_n is not used).
+        """
+        df = store.played()
+        if window is not None and (window.season_from is not None or window.season_to is not None):
+            if window.season_from is not None:
+                df = df[df['season'] >= window.season_from]
+            if window.season_to is not None:
+                df = df[df['season'] <= window.season_to]
+        as_of = window.as_of.date().isoformat() if window is not None and window.as_of is not None else None
+        return cls.fit(df['homeId'].to_numpy(), df['awayId'].to_numpy(), df['homeScore'], df['awayScore'],
+                       df['date'].values, xi, as_of, warm_start, team_names=store.registry.names)
+
+    @staticmethod
+    def _fit_rho(home_goals, away_goals, lambda_home, lambda_away, weights):
+        # Only 0-0, 0-1, 1-0 and 1-1 results depend on rho
+        low = (home_goals <= 1) & (away_goals <= 1)
+        hg, ag = home_goals[low], away_goals[low]
+        lh, la, w = lambda_home[low], lambda_away[low], weights[low]
+        if not low.any():
+            return 0.0
+
+        # Keep every tau positive
+        lo, hi = RHO_BOUNDS
+        zero_zero = (hg == 0) & (ag == 0)
+        if zero_zero.any():
+            hi = min(hi, (1 / (lh[zero_zero] * la[zero_zero])).min() - 1e-6)
+        if ((hg == 0) & (ag == 1)).any():
+            lo = max(lo, (-1 / lh[(hg == 0) & (ag == 1)]).max() + 1e-6)
+        if ((hg == 1) & (ag == 0)).any():
+            lo = max(lo, (-1 / la[(hg == 1) & (ag == 0)]).max() + 1e-6)
+
+        def objective(rho):
+            return (w * np.log(_tau(hg, ag, lh, la, rho))).sum()
+
+        # Golden-section search; the objective is concave in rho
+        ratio = (np.sqrt(5) - 1) / 2
+        x1, x2 = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+        f1, f2 = objective(x1), objective(x2)
+        while hi - lo > 1e-6:
+            if f1 < f2:
+                lo, x1, f1 = x1, x2, f2
+                x2 = lo + ratio * (hi - lo)
+                f2 = objective(x2)
+            else:
+                hi, x2, f2 = x2, x1, f1
+                x1 = hi - ratio * (hi - lo)
+                f1 = objective(x1)
+        return (lo + hi) / 2
+
+    def expected_goals(self, home_teams, away_teams):
+        """
+        Expected goals for fixtures. Teams the fit hasn't seen get average
+        (zero) ratings.
+
+        Returns:
+            tuple: (lambda_home, lambda_away) arrays.
+        """
+        h = np.array([self._team_pos.get(t, -1) for t in home_teams], dtype=np.int64)
+        a = np.array([self._team_pos.get(t, -1) for t in away_teams], dtype=np.int64)
+        return self._expected_goals_at(h, a)
+
+    def expected_goals_by_id(self, home_ids, away_ids):
+        """
+        expected_goals for fixtures given as team ids of the registry the
+        model was fitted with (see fit's ``team_names``); -1 or an id the
+        fit hasn't seen gets average ratings.
+
+        Raises:
+            ValueError: If the model was fitted from names.
+        """
+        if self.team_ids is None:
+            raise ValueError("Model was not fitted from team ids")
+        home_ids = np.asarray(home_ids, dtype=np.int64)
+        away_ids = np.asarray(away_ids, dtype=np.int64)
+        size = max(int(self.team_ids.max(initial=-1)), int(home_ids.max(initial=-1)),
+                   int(away_ids.max(initial=-1))) + 2
+        # Last slot catches -1
+        lookup = np.full(size, -1, dtype=np.int64)
+        lookup[self.team_ids] = np.arange(len(self.team_ids))
+        return self._expected_goals_at(lookup[home_ids], lookup[away_ids])
+
+    def _expected_goals_at(self, h, a):
+        # Rating positions per fixture; -1 picks the appended average (zero) rating
+        attack = np.append(self.attack, 0.0)
+        defence = np.append(self.defence, 0.0)
+        lambda_home = np.exp(self.home_advantage + attack[h] + defence[a])
+        lambda_away = np.exp(attack[a] + defence[h])
+        return lambda_home, lambda_away
+
+    def score_matrices(self, lambda_home, lambda_away, max_goals=DEFAULT_MAX_GOALS):
+        return dixon_coles_matrices(lambda_home, lambda_away, self.rho, max_goals)
+
+    def team_ratings(self):
+        """
+        Returns:
+            dict: Team -> {"attack", "defence"} on the log scale (attack
+            above 0 scores more than average, defence above 0 concedes more).
+        """
+        return {team: {"attack": round(float(self.attack[i]), 4), "defence": round(float(self.defence[i]), 4)}
+                for i, team in enumerate(self.teams)}
+
+    def to_dict(self):
+        return {
+            "home_advantage": round(self.home_advantage, 4),
+            "rho": round(self.rho, 4),
+            "xi": self.xi,
+            "reference_date": self.reference_date,
+            "iterations": self.iterations,
+            "log_likelihood": round(self.log_likelihood, 3) if self.log_likelihood is not None else None,
+            "teams": self.team_ratings()
+        }
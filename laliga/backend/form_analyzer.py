@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import json
-import os
+from match_store import MatchStore
+from team_windows import TeamWindowIndex
+from metrics import timer
 
 class RecentFormAnalyzer:
     """
@@ -9,20 +12,25 @@ class RecentFormAnalyzer:
     """
     def __init__(self, data_source):
         """
-        Initialize with a path to a CSV or JSON file.
+        Initialize with a path to a CSV or JSON file, or a shared MatchStore.
         """
+        # A MatchStore has already parsed dates and cleaned team names
+        self._store = data_source if isinstance(data_source, MatchStore) else None
+        self._shared = self._store is not None
         self.df = self._load_data(data_source)
         self._preprocess_data()
+        self._build_team_index()
 
     def _load_data(self, source):
-        if source.endswith('.csv'):
+        if isinstance(source, MatchStore):
+            return source.df
+        elif source.endswith('.csv'):
             return pd.read_csv(source)
         elif source.endswith('.json'):
-            with open(source, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            # Normalize JSON keys to match expected CSV-style column names if necessary
-            # For this project, we assume standard column names as requested.
-            return pd.DataFrame(data)
+            # Goes through MatchStore so the columnar copy is used when present
+            self._store = MatchStore.from_file(source)
+            self._shared = True
+            return self._store.df
         else:
             raise ValueError("Unsupported data format. Please provide .csv or .json")
 
@@ -38,7 +46,11 @@ class RecentFormAnalyzer:
             'awayTeam': 'AwayTeam',
             'date': 'Date'
         }
-        self.df.rename(columns=name_map, inplace=True)
+        # Not inplace: the frame may be shared with other models via MatchStore
+        self.df = self.df.rename(columns=name_map)
+
+        if self._shared:
+            return
 
         # Convert Date to datetime for chronological sorting
         if 'Date' in self.df.columns:
@@ -49,18 +61,48 @@ class RecentFormAnalyzer:
             if col in self.df.columns:
                 self.df[col] = self.df[col].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
 
-    def get_team_form(self, team_name, last_n=5):
+    def _build_team_index(self):
+        """
+        Per-team, date-sorted match index (see TeamWindowIndex). Built once,
+        or shared with the MatchStore, so get_team_form is a slice, not a scan.
+        """
+        df = self.df
+        self._home = df['HomeTeam'].to_numpy(dtype=object)
+        self._away = df['AwayTeam'].to_numpy(dtype=object)
+        self._dates = df['Date'].dt.strftime('%Y-%m-%d').fillna('Unknown').to_numpy(dtype=object)
+        if self._store is not None:
+            self.team_index = self._store.team_index
+            self._team_id = self._store.registry.id
+        else:
+            self.team_index = TeamWindowIndex(
+                df['HomeTeam'], df['AwayTeam'], df['HomeGoals'], df['AwayGoals'], df['Date'],
+                df['season'] if 'season' in df.columns else None
+            )
+            self._team_id = {team: i for i, team in enumerate(self.team_index.team_names)}.get
+
+    def get_team_form(self, team_name, last_n=5, window=None):
         """
         Filters the last N matches for a team and calculates form statistics.
         Returns a dictionary with result counts and goal totals.
+
+        Args:
+            team_name (str): Team to analyse.
+            last_n (int): Number of most recent matches.
+            window (Window): Optional as-of date / season range; the last N
+                matches are taken inside it. Defaults to all history.
         """
-        # Clean input name just in case
-        team_name = ' '.join(str(team_name).split())
+        with timer('laliga_analyzer_seconds', method='get_team_form'):
+            return self._team_form(team_name, last_n, window)
 
-        # Filter matches where the team played (either Home or Away)
-        team_matches = self.df[(self.df['HomeTeam'] == team_name) | (self.df['AwayTeam'] == team_name)].copy()
-        
-        if team_matches.empty:
+    def _team_form(self, team_name, last_n, window):
+        # Clean input name just in case; a shared store also resolves aliases
+        if self._store is not None:
+            team_name = self._store.registry.resolve(team_name)
+        else:
+            team_name = ' '.join(str(team_name).split())
+
+        recent = self.team_index.recent(self._team_id(team_name), last_n, window)
+        if recent is None or not len(recent["positions"]):
             # Return a valid structure with zeros instead of an error to prevent pipeline crashes
             return {
                 "team": team_name,
@@ -71,59 +113,39 @@ class RecentFormAnalyzer:
                 "error": "No matches found"
             }
 
-        # Sort by date descending and take last N
-        last_matches = team_matches.sort_values(by='Date', ascending=False).head(last_n)
+        # Index slices are already newest first
+        pos = recent["positions"]
+        is_home = recent["is_home"]
+        goals_for = recent["goals_for"]
+        goals_against = recent["goals_against"]
+        h_goals = np.where(is_home, goals_for, goals_against)
+        a_goals = np.where(is_home, goals_against, goals_for)
+
+        wins = goals_for > goals_against
+        draws = goals_for == goals_against
 
         results = {
             "team": team_name,
-            "period": f"Last {len(last_matches)} matches",
-            "wins": 0,
-            "draws": 0,
-            "losses": 0,
-            "goals_scored": 0,
-            "goals_conceded": 0,
+            "period": f"Last {len(pos)} matches",
+            "wins": int(wins.sum()),
+            "draws": int(draws.sum()),
+            "losses": int(len(pos) - wins.sum() - draws.sum()),
+            "goals_scored": int(goals_for.sum()),
+            "goals_conceded": int(goals_against.sum()),
             "match_history": []
         }
 
-        for _, match in last_matches.iterrows():
-            is_home = match['HomeTeam'] == team_name
-            h_goals = int(match['HomeGoals'])
-            a_goals = int(match['AwayGoals'])
-            
-            # Determine goals for/against
-            goals_for = h_goals if is_home else a_goals
-            goals_against = a_goals if is_home else h_goals
-            
-            results["goals_scored"] += goals_for
-            results["goals_conceded"] += goals_against
-            
-            # Determine outcome
-            outcome = ""
-            if h_goals == a_goals:
-                results["draws"] += 1
-                outcome = "Draw"
-            elif (is_home and h_goals > a_goals) or (not is_home and a_goals > h_goals):
-                results["wins"] += 1
-                outcome = "Win"
-            else:
-                results["losses"] += 1
-                outcome = "Loss"
-            
-            # Track history for Viva explanation
-            match_date = match['Date']
-            if hasattr(match_date, 'date'):
-                date_str = str(match_date.date())
-            elif isinstance(match_date, str):
-                date_str = match_date.split('T')[0] # handle potential ISO strings
-            else:
-                date_str = "Unknown"
-
+        # Track history for Viva explanation
+        opponents = np.where(is_home, self._away[pos], self._home[pos])
+        outcomes = np.where(wins, "Win", np.where(draws, "Draw", "Loss"))
+        dates = self._dates[pos]
+        for i in range(len(pos)):
             results["match_history"].append({
-                "date": date_str,
-                "opponent": match['AwayTeam'] if is_home else match['HomeTeam'],
-                "venue": "Home" if is_home else "Away",
-                "score": f"{h_goals}-{a_goals}",
-                "outcome": outcome
+                "date": dates[i],
+                "opponent": opponents[i],
+                "venue": "Home" if is_home[i] else "Away",
+                "score": f"{h_goals[i]}-{a_goals[i]}",
+                "outcome": str(outcomes[i])
             })
 
         return results
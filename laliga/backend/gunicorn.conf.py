@@ -0,0 +1,23 @@
+# Multi-worker deployment: gunicorn -c gunicorn.conf.py main:app
+#
+# The app (and its PredictionEngine) is loaded once in the master and the
+# workers are forked from it, so the dataset, the aggregates, the Dixon-Coles
+# fit and the imported libraries are shared copy-on-write instead of being
+# built per worker. A refresh in any worker publishes a new columnar snapshot
+# that the other workers pick up from disk (see SnapshotWatcher in
+# refresh_job.py) without re-reading the JSON. From then on every worker has
+# its own engine: only the snapshot's memory-mapped numeric columns are shared
+# (through the page cache); names, aggregates and fits are per worker.
+import os
+
+bind = os.environ.get("LALIGA_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("LALIGA_WORKERS", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before any worker forks
+    import main
+    main.preload()
+    server.log.info(f"Preloaded dataset version {main.engine.data_version if main.engine else None}")
@@ -1,14 +1,25 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-import sys
+from typing import List, Optional
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
 import os
+import asyncio
+import gc
+import json
+import threading
+import time
+import traceback
 
-# Add scripts directory to path to import scraping logic if needed
-# scraper is now in the same directory (backend), so direct import works
-import scraper
-
-from predictor import PredictionEngine
+# Only light modules are imported here so a worker is up (and answering
+# liveness checks) quickly. pandas/numpy come in with the engine, which
+# loads in the background at startup, and the scraper (BeautifulSoup,
+# requests, cloudscraper) is only imported when a refresh runs.
+from metrics import REGISTRY, inc, observe
+from refresh_job import RefreshJob, SnapshotWatcher, file_lock
+from workpool import WorkPool, Overloaded
 
 app = FastAPI(title="LaLiga Predictor API")
 
@@ -21,41 +32,362 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-engine = PredictionEngine()
+# Lambda model behind the API. In the walk-forward backtest (backtest.py)
+# the fitted Dixon-Coles ratings beat the recent-form ratios on log-loss,
+# Brier score and RPS in every season.
+PREDICTION_MODEL = "dixon_coles"
+
+# Set LALIGA_LAZY_STARTUP=0 to load the engine before the worker starts
+# accepting requests instead of in the background
+LAZY_STARTUP = os.environ.get("LALIGA_LAZY_STARTUP", "1") != "0"
+# Optional SQLite file persisting predictions and simulations across
+# restarts and workers (see disk_cache.py), e.g. /var/cache/laliga/cache.db
+DISK_CACHE_PATH = os.environ.get("LALIGA_DISK_CACHE")
+
+# Handlers read this global once per request; a refresh replaces it in a
+# single assignment with an engine built off to the side. None until the
+# first engine has loaded (see /ready).
+engine = None
+engine_error = None
+
+def _publish_engine(new_engine):
+    global engine
+    engine = new_engine
+
+def _build_engine():
+    from predictor import PredictionEngine
+    if engine is not None:
+        return engine.rebuild()
+    disk_cache = None
+    if DISK_CACHE_PATH:
+        from disk_cache import DiskCache
+        disk_cache = DiskCache(DISK_CACHE_PATH)
+    return PredictionEngine(model=PREDICTION_MODEL, disk_cache=disk_cache)
+
+def _load_engine():
+    global engine_error
+    try:
+        with REGISTRY.time('laliga_startup_seconds'):
+            new_engine = _build_engine()
+            if new_engine.disk_cache is not None:
+                # Current season's pairs, read back from disk in one query
+                new_engine.warm_cache()
+            _publish_engine(new_engine)
+        engine_error = None
+    except Exception as e:
+        engine_error = str(e)
+        print(f"Engine failed to load: {e}")
+        traceback.print_exc()
+
+def _current_engine():
+    current = engine
+    if current is None:
+        raise HTTPException(status_code=503, detail=engine_error or "Engine is still loading",
+                            headers={"Retry-After": "1"})
+    return current
+
+def _run_scraper():
+    import scraper
+    # One scrape at a time across all workers on the host. A worker that
+    # waited here finds nothing changed and picks up the other's data
+    # through the snapshot watcher.
+    with file_lock(scraper.OUTPUT_JSON_FILE + '.lock'):
+        # The live season's page is revalidated with a conditional GET; only
+        # seasons whose HTML changed are re-parsed and merged into the JSON file
+        return scraper.main(incremental=True, revalidate=True)
+
+def _published_version():
+    from match_columns import current_version
+    current = engine
+    return current_version(current.data_file) if current is not None else None
+
+def preload():
+    """
+    Loads the engine in this process before workers are forked (gunicorn
+    preload_app, see gunicorn.conf.py). The workers then share the
+    dataset, the aggregates and the imported libraries copy-on-write
+    instead of each loading its own. That only lasts until the first
+    refresh: each worker then builds its own engine from the new
+    snapshot, sharing just its memory-mapped numeric columns.
+    """
+    from match_columns import ensure_columns
+    from predictor import DATA_FILE
+    # Write the memory-mapped snapshot once here rather than have every
+    # worker fall back to parsing the JSON
+    ensure_columns(DATA_FILE)
+    _load_engine()
+    # Keep the GC from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+# CPU-bound work (predictions, simulations, the full match list) runs on
+# dedicated threads; each endpoint gets its own threads and queue limit so a
+# burst or a slow call on one can't hold up the others. Cheap reads stay on
+# the event loop.
+work_pool = WorkPool()
+predict_limiter = work_pool.limiter("predict", max_running=4, max_queued=32)
+batch_limiter = work_pool.limiter("predict_batch", max_running=2, max_queued=8)
+# One simulation at a time; they are cached, so repeats are cheap
+simulate_limiter = work_pool.limiter("simulate", max_running=1, max_queued=2)
+matches_limiter = work_pool.limiter("matches", max_running=2, max_queued=16)
+
+def _engine_gauges():
+    # Read on scrape from whichever engine is currently published
+    current = engine
+    return {
+        "laliga_matches_loaded": {(): len(current.store) if current is not None and current.store else 0},
+        "laliga_prediction_cache_entries": {(): current.cache_sizes()["prediction"] if current is not None else 0},
+        "laliga_endpoint_pending": {(("endpoint", name),): limiter.pending
+                                    for name, limiter in work_pool.limiters.items()},
+    }
+
+REGISTRY.add_collector(_engine_gauges)
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, to keep the series bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        inc('laliga_http_requests_total', route=path, method=request.method, status=status)
+        observe('laliga_http_request_seconds', time.perf_counter() - start, route=path)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=429, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.on_event("startup")
+def start_engine():
+    # Already there when preloaded by the master
+    if engine is None:
+        if LAZY_STARTUP:
+            threading.Thread(target=_load_engine, name="engine-loader", daemon=True).start()
+        else:
+            _load_engine()
+    snapshot_watcher.start()
+
+@app.on_event("shutdown")
+def shutdown_work_pool():
+    snapshot_watcher.stop()
+    work_pool.shutdown()
+
+refresh_job = RefreshJob(
+    run_scraper=_run_scraper,
+    build_engine=_build_engine,
+    publish=_publish_engine
+)
+
+# Follows refreshes done by other workers (see SnapshotWatcher)
+snapshot_watcher = SnapshotWatcher(
+    current_version=_published_version,
+    serving_version=lambda: engine.data_version if engine is not None else None,
+    build_engine=_build_engine,
+    publish=_publish_engine
+)
 
 class PredictionRequest(BaseModel):
     home_team: str
     away_team: str
+    # Optional data window; omitted fields mean "all history"
+    as_of: Optional[date] = None # only matches before this date
+    season_from: Optional[str] = None # e.g. "2022-2023", inclusive
+    season_to: Optional[str] = None
+    last_n: Optional[int] = Field(default=None, gt=0) # rolling window for the Poisson averages
+
+    def window(self):
+        from team_windows import Window
+        return Window(self.as_of, self.season_from, self.season_to, self.last_n)
+
+class BatchPredictionRequest(BaseModel):
+    fixtures: List[PredictionRequest]
+    stream: bool = False # Return NDJSON, one prediction per line
+
+# Fixtures predicted per chunk when streaming a batch
+BATCH_STREAM_CHUNK = 50
+# /api/simulate runs in-process: forking a process pool from a threaded
+# server risks inheriting held locks, and at API sizes the pool startup
+# costs more than it saves (results don't depend on it)
+SIMULATION_WORKERS = 1
 
 @app.get("/")
-def read_root():
-    return {"status": "ok", "message": "LaLiga Predictor API is running"}
+async def read_root():
+    # Liveness: the process is up, whether or not the engine has loaded
+    return {"status": "ok", "message": "LaLiga Predictor API is running", "ready": engine is not None}
+
+@app.get("/ready")
+async def ready():
+    # Readiness: 200 once predictions can be served, 503 until then
+    current = engine
+    if current is None:
+        state = "failed" if engine_error else "loading"
+        return JSONResponse(status_code=503, content={"status": state, "error": engine_error},
+                            headers={"Retry-After": "1"})
+    return {"status": "ready", "data_version": current.data_version,
+            "matches": len(current.store) if current.store else 0}
 
 @app.get("/api/teams")
-def get_teams():
-    return {"teams": engine.get_teams()}
+async def get_teams():
+    # Precomputed per engine load
+    return {"teams": _current_engine().get_teams()}
 
 @app.get("/api/matches")
-def get_matches():
-    return {"matches": engine.matches}
+async def get_matches(
+    request: Request,
+    season: Optional[str] = None,
+    team: Optional[str] = None,
+    matchday: Optional[int] = Query(default=None, ge=1),
+    date_from: Optional[date] = None, # inclusive
+    date_to: Optional[date] = None, # inclusive
+    cursor: Optional[str] = None, # next_cursor from the previous page
+    limit: Optional[int] = Query(default=None, ge=1), # default/max in match_query.py
+    fields: Optional[str] = None # e.g. "id,homeTeam,awayTeam,homeScore,awayScore"
+):
+    current = _current_engine()
+    from match_query import MatchQuery
+    try:
+        query = MatchQuery(season, team, matchday, date_from, date_to, cursor, limit, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": current.matches_etag(query), "Cache-Control": "no-cache"}
+    if current.data_modified is not None:
+        headers["Last-Modified"] = formatdate(current.data_modified, usegmt=True)
+    if _not_modified(request, headers["ETag"], current.data_modified):
+        return Response(status_code=304, headers=headers)
+
+    # Cached pages are sent straight from the loop; building one goes to the pool
+    body = current.matches_page(query, build=False)
+    if body is None:
+        body = await matches_limiter.run(current.matches_page, query)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _not_modified(request, etag, modified):
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(modified) <= since
+    return False
 
 @app.post("/api/predict")
-def predict_match(request: PredictionRequest):
+async def predict_match(request: PredictionRequest):
+    current = _current_engine()
     try:
-        result = engine.predict_match(request.home_team, request.away_team)
-        return result
+        return await predict_limiter.run(current.predict_match, request.home_team, request.away_team,
+                                         request.window())
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/refresh")
-def refresh_data():
+def _predict_fixtures(current, requests):
+    # predict_many takes one window per call, so group fixtures by window
+    groups = {}
+    for i, r in enumerate(requests):
+        window = r.window()
+        groups.setdefault(window.key(), (window, []))[1].append(i)
+
+    results = [None] * len(requests)
+    for window, indices in groups.values():
+        fixtures = [(requests[i].home_team, requests[i].away_team) for i in indices]
+        for i, result in zip(indices, current.predict_many(fixtures, window)):
+            results[i] = result
+    return results
+
+@app.post("/api/predict/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    fixtures = request.fixtures
+
+    current = _current_engine() # Keep one engine for the whole stream, even across a refresh
+
+    if request.stream:
+        # The first chunk is computed before the response starts, so an
+        # overloaded pool still gets a 429 instead of a cut-off stream
+        try:
+            first = await batch_limiter.run(_predict_fixtures, current, fixtures[:BATCH_STREAM_CHUNK])
+        except Overloaded:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        async def generate():
+            for result in first:
+                yield json.dumps(result) + "\n"
+            for start in range(BATCH_STREAM_CHUNK, len(fixtures), BATCH_STREAM_CHUNK):
+                try:
+                    chunk = await batch_limiter.run(_predict_fixtures, current,
+                                                    fixtures[start:start + BATCH_STREAM_CHUNK], admitted=True)
+                except Exception as e:
+                    # The 200 is already sent; end with an error record so the
+                    # client can tell a failed stream from a complete one
+                    traceback.print_exc()
+                    yield json.dumps({"error": str(e), "index": start}) + "\n"
+                    return
+                for result in chunk:
+                    yield json.dumps(result) + "\n"
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
     try:
-        scraper.main() # This updates the JSON file
-        engine.load_data() # Reload data in engine
-        return {"status": "success", "message": "Data refreshed successfully"}
+        return {"predictions": await batch_limiter.run(_predict_fixtures, current, fixtures)}
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/simulate")
+async def simulate_season(
+    season: Optional[str] = None, # defaults to the latest season
+    as_of: Optional[date] = None, # replay the season from this date
+    n_sims: Optional[int] = Query(default=None, ge=1, le=100000), # default: DEFAULT_SIMULATIONS
+    seed: int = Query(default=0, ge=0)
+):
+    current = _current_engine()
+    from simulator import DEFAULT_SIMULATIONS
+    # Cached per data version and parameters, so repeated calls are instant
+    try:
+        return await simulate_limiter.run(current.simulate_season, season, as_of, n_sims or DEFAULT_SIMULATIONS,
+                                          seed, SIMULATION_WORKERS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/refresh")
+async def refresh_data(wait: bool = False):
+    # Runs in the background; the current engine keeps serving until the new
+    # one is fully built. Pass ?wait=true to block until the job finishes.
+    started, status = refresh_job.start()
+    if wait:
+        # Only waits on the job's own thread, so not on the work pool
+        status = await asyncio.to_thread(refresh_job.wait)
+        if status["state"] == "failed":
+            raise HTTPException(status_code=500, detail=status["error"])
+        message = "Data refreshed successfully" if status["changed_seasons"] else "Data already up to date"
+        return {"status": "success", "message": message, "job": status}
+
+    message = "Refresh started" if started else "Refresh already in progress"
+    return JSONResponse(status_code=202, content={"status": status["state"], "message": message, "job": status})
+
+@app.get("/api/refresh/status")
+async def refresh_status():
+    return refresh_job.status()
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from team_registry import TeamRegistry
+
+# Bump when the on-disk layout changes; older artifacts are then ignored
+FORMAT_VERSION = 4
+# Snapshot versions kept next to the current one. Processes that still map
+# an older version keep reading it (the files are only unlinked), but a
+# grace copy avoids surprising anyone listing the directory mid-switch.
+SNAPSHOT_KEEP = 1
+
+# Record field -> (column file, dtype). Team, venue, season and kick-off time
+# strings are dictionary-encoded as small integer ids into meta.json.
+# Columns that end up in MatchStore's DataFrame (scores, matchday, team ids,
+# date, played) are stored in the frame's own dtypes so it can use the
+# memory-mapped files as they are instead of copying them.
+NUMERIC_FIELDS = {
+    "homeScore": ("home_score", np.int64),
+    "awayScore": ("away_score", np.int64),
+    "homeWinProb": ("home_win_prob", np.int8),
+    "drawProb": ("draw_prob", np.int8),
+    "awayWinProb": ("away_win_prob", np.int8),
+    "confidence": ("confidence", np.int8),
+    "matchday": ("matchday", np.int64),
+}
+ENCODED_FIELDS = {
+    "homeTeam": ("home_id", "teams"),
+    "awayTeam": ("away_id", "teams"),
+    "stadium": ("stadium_id", "stadiums"),
+    "season": ("season_id", "seasons"),
+    "time": ("time_id", "times"),
+}
+
+
+def columns_path(json_path):
+    """
+    Directory holding the columnar copies of a matches JSON file: one
+    subdirectory per snapshot version plus a CURRENT file naming the one
+    in use, so a new version is published with a single rename.
+    """
+    return os.path.splitext(json_path)[0] + '.columns'
+
+
+def source_hash(json_path):
+    with open(json_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def current_version(json_path):
+    """
+    Version (the JSON content hash prefix) of the published snapshot, or
+    None if there is none. One small read, cheap enough to poll.
+    """
+    try:
+        with open(os.path.join(columns_path(json_path), 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _stat_key(json_path):
+    st = os.stat(json_path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def write_columns(matches, json_path, count=None):
+    """
+    Writes the columnar artifact next to ``json_path``: one uncompressed
+    .npy file per column (memory-mappable) plus meta.json with the string
+    dictionaries and the hash of the JSON file it mirrors, as a new
+    snapshot version, then points CURRENT at it.
+
+    Args:
+        matches (iterable): Match dicts as written to ``json_path``.
+        json_path (str): The JSON file the artifact is derived from.
+        count (int): Number of matches, required when ``matches`` is a
+            generator (e.g. match_ndjson.iter_matches) rather than a list.
+
+    Returns:
+        bool: False if the records don't fit the format (the JSON stays the
+        only copy in that case).
+    """
+    try:
+        columns, vocab = _encode(matches, count)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"Skipping columnar dataset: {e}")
+        return False
+
+    root = columns_path(json_path)
+    digest = source_hash(json_path)
+    version = digest[:16]
+    target = os.path.join(root, version)
+    staging = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, values in columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values)
+    with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "source_hash": digest,
+            # Lets readers skip re-hashing the JSON while it is untouched
+            "source_stat": _stat_key(json_path),
+            "count": len(columns["seq"]),
+            **vocab
+        }, f)
+
+    # Readers only ever follow CURRENT, so the version directory can be
+    # replaced freely before the pointer moves
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    pointer = os.path.join(root, f"CURRENT.{os.getpid()}.tmp")
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, 'CURRENT'))
+    _prune(root, version)
+    return True
+
+
+def _prune(root, current):
+    versions = [entry for entry in os.scandir(root)
+                if entry.is_dir() and entry.name != current and not entry.name.endswith('.tmp')]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[SNAPSHOT_KEEP:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def ensure_columns(json_path):
+    """
+    Builds the columnar copy of ``json_path`` if it is missing or stale.
+
+    Returns:
+        bool: True if a snapshot was written.
+    """
+    if read_columns(json_path) is not None or not os.path.exists(json_path):
+        return False
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return write_columns(json.load(f), json_path)
+
+
+def _encode(matches, count=None):
+    vocab = {"teams": {}, "stadiums": {}, "seasons": {}, "times": {}}
+    n = len(matches) if count is None else count
+    columns = {name: np.empty(n, dtype=dtype) for name, dtype in NUMERIC_FIELDS.values()}
+    for name, _ in ENCODED_FIELDS.values():
+        columns[name] = np.empty(n, dtype=np.int64 if name in ("home_id", "away_id") else np.int16)
+    columns["seq"] = np.empty(n, dtype=np.int32)
+    columns["played"] = np.empty(n, dtype=bool)
+    dates = []
+
+    for i, m in enumerate(matches):
+        for field, (name, _) in NUMERIC_FIELDS.items():
+            columns[name][i] = m[field]
+        for field, (name, table) in ENCODED_FIELDS.items():
+            ids = vocab[table]
+            columns[name][i] = ids.setdefault(m[field], len(ids))
+        # Ids are "<season>-<n>"; store n only
+        prefix = f"{m['season']}-"
+        if not m['id'].startswith(prefix) or not m['id'][len(prefix):].isdigit():
+            raise ValueError(f"unexpected match id {m['id']!r}")
+        columns["seq"][i] = int(m['id'][len(prefix):])
+        # Files written before the flag existed only held played matches
+        columns["played"][i] = m.get('played', True)
+        dates.append(m['date'])
+    if len(dates) != n:
+        raise ValueError(f"expected {n} matches, got {len(dates)}")
+
+    days = np.array(dates, dtype='datetime64[D]')
+    if len(dates) and [str(d) for d in days] != dates:
+        raise ValueError("dates are not all ISO YYYY-MM-DD")
+    columns["date"] = days.astype('datetime64[ns]')
+    vocab = {table: list(ids) for table, ids in vocab.items()}
+
+    # Team ids are stored as TeamRegistry ids (and the names as its
+    # canonical names), which is what the store indexes by
+    registry = TeamRegistry(vocab["teams"])
+    remap = registry.ids(vocab["teams"])
+    if (remap < 0).any():
+        raise ValueError("team names the registry can't resolve")
+    columns["home_id"] = remap[columns["home_id"]]
+    columns["away_id"] = remap[columns["away_id"]]
+    vocab["teams"] = list(registry.names)
+    return columns, vocab
+
+
+def read_columns(json_path, mmap=True):
+    """
+    Loads the columnar artifact for ``json_path`` if it exists and was built
+    from the current contents of that file.
+
+    Returns:
+        tuple | None: (columns, meta) where columns maps column names to
+        (memory-mapped) arrays, or None if the artifact is missing or stale.
+    """
+    version = current_version(json_path)
+    if version is None:
+        return None
+    target = os.path.join(columns_path(json_path), version)
+    meta_path = os.path.join(target, 'meta.json')
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format_version") != FORMAT_VERSION:
+        return None
+    # Same size and mtime as when the snapshot was written: trust it without
+    # reading the JSON; otherwise compare content hashes
+    if os.path.exists(json_path) and meta.get("source_stat") != _stat_key(json_path) \
+            and meta.get("source_hash") != source_hash(json_path):
+        return None
+
+    names = [name for name, _ in NUMERIC_FIELDS.values()]
+    names += [name for name, _ in ENCODED_FIELDS.values()]
+    names += ["seq", "date", "played"]
+    columns = {}
+    for name in names:
+        path = os.path.join(target, f"{name}.npy")
+        if not os.path.exists(path):
+            return None
+        columns[name] = np.load(path, mmap_mode='r' if mmap else None)
+    return columns, meta
+
+
+def decode_records(columns, meta):
+    """
+    Rebuilds the scraper's match dicts (same keys and order) from columns.
+    """
+    teams = meta["teams"]
+    stadiums = meta["stadiums"]
+    seasons = meta["seasons"]
+    times = meta["times"]
+    dates = columns["date"].astype('datetime64[D]').astype(str).tolist()
+    cols = {name: columns[name].tolist() for name in
+            ("home_id", "away_id", "home_score", "away_score", "home_win_prob", "draw_prob",
+             "away_win_prob", "confidence", "time_id", "stadium_id", "matchday", "season_id", "seq",
+             "played")}
+
+    records = []
+    for i in range(meta["count"]):
+        season = seasons[cols["season_id"][i]]
+        records.append({
+            "id": f"{season}-{cols['seq'][i]}",
+            "homeTeam": teams[cols["home_id"][i]],
+            "awayTeam": teams[cols["away_id"][i]],
+            "homeScore": cols["home_score"][i],
+            "awayScore": cols["away_score"][i],
+            "homeWinProb": cols["home_win_prob"][i],
+            "drawProb": cols["draw_prob"][i],
+            "awayWinProb": cols["away_win_prob"][i],
+            "confidence": cols["confidence"][i],
+            "date": dates[i],
+            "time": times[cols["time_id"][i]],
+            "stadium": stadiums[cols["stadium_id"][i]],
+            "matchday": cols["matchday"][i],
+            "season": season,
+            "played": cols["played"][i]
+        })
+    return records
+
+
+if __name__ == "__main__":
+    # Build the columnar copy of the current dataset without re-scraping
+    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    OUTPUT_JSON_FILE = os.path.join(PROJECT_ROOT, 'src/data/matches-all-seasons.json')
+
+    if ensure_columns(OUTPUT_JSON_FILE):
+        print(f"Wrote {columns_path(OUTPUT_JSON_FILE)} ({current_version(OUTPUT_JSON_FILE)})")
+    else:
+        print(f"{columns_path(OUTPUT_JSON_FILE)} is up to date")
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+
+# Bump when the on-disk layout changes; older manifests are then ignored
+FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+
+
+def ndjson_path(json_path):
+    """
+    Directory holding the per-season NDJSON copies of a matches JSON file:
+    one <season>.<hash>.ndjson file (one match object per line) per season
+    plus manifest.json listing them in season order.
+    """
+    return os.path.splitext(json_path)[0] + '.ndjson'
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class SeasonWriter:
+    """
+    Writes seasons to the NDJSON directory of ``json_path`` as they come in,
+    so the scraper never has to hold the whole dataset. Seasons may arrive
+    in any order. Files are named after their content hash, so a new
+    season never overwrites a file the current manifest lists: readers
+    keep seeing the previous, consistent set until close() publishes the
+    new manifest, even if the run dies halfway.
+
+    Use as a context manager; the manifest is not written if the block
+    raises, leaving the previous one in place.
+    """
+    def __init__(self, json_path):
+        self.root = ndjson_path(json_path)
+        self.seasons = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def write_season(self, season_str, matches):
+        """
+        Args:
+            season_str (str): Season such as "2024-2025".
+            matches (iterable): Match dicts of that season, in order.
+        """
+        digest = hashlib.sha1()
+        count = 0
+        tmp_path = os.path.join(self.root, f"{season_str}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for match in matches:
+                line = json.dumps(match, ensure_ascii=False) + '\n'
+                digest.update(line.encode('utf-8'))
+                f.write(line)
+                count += 1
+
+        name = f"{season_str}.{digest.hexdigest()[:16]}.ndjson"
+        os.replace(tmp_path, os.path.join(self.root, name))
+        self.seasons[season_str] = {"season": season_str, "file": name, "count": count,
+                                    "sha1": digest.hexdigest()}
+
+    def close(self):
+        """Publishes the manifest and removes season files it doesn't list."""
+        seasons = [self.seasons[s] for s in sorted(self.seasons)]
+        _write_atomic(os.path.join(self.root, MANIFEST_NAME), lambda f: json.dump({
+            "format_version": FORMAT_VERSION,
+            "count": sum(s["count"] for s in seasons),
+            "seasons": seasons
+        }, f, indent=2))
+        listed = {s["file"] for s in seasons}
+        for entry in os.scandir(self.root):
+            if entry.name.endswith('.ndjson') and entry.name not in listed:
+                os.remove(entry.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def read_manifest(json_path):
+    """
+    Returns:
+        dict | None: The manifest ("count" and per-season "seasons" entries)
+        or None if there is no usable one.
+    """
+    try:
+        with open(os.path.join(ndjson_path(json_path), MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def iter_matches(json_path, seasons=None):
+    """
+    Yields the match dicts of the NDJSON copy one line at a time, in
+    dataset order, so only the current match is held in memory. Each
+    season file is checked against the count and hash in the manifest.
+
+    Args:
+        json_path (str): The matches JSON file the copy belongs to.
+        seasons (iterable): Only yield these seasons (default all).
+
+    Raises:
+        FileNotFoundError: If there is no manifest.
+        ValueError: When a season file doesn't match the manifest (raised
+            after its matches were yielded).
+    """
+    manifest = read_manifest(json_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No NDJSON manifest in {ndjson_path(json_path)}")
+    wanted = set(seasons) if seasons is not None else None
+    root = ndjson_path(json_path)
+    for entry in manifest["seasons"]:
+        if wanted is not None and entry["season"] not in wanted:
+            continue
+        digest = hashlib.sha1()
+        count = 0
+        with open(os.path.join(root, entry["file"]), 'r', encoding='utf-8') as f:
+            for line in f:
+                digest.update(line.encode('utf-8'))
+                if line.strip():
+                    count += 1
+                    yield json.loads(line)
+        if count != entry["count"] or digest.hexdigest() != entry["sha1"]:
+            raise ValueError(f"{entry['file']} doesn't match the manifest in {root}")
+
+
+def write_json_array(matches, json_path):
+    """
+    Streams matches into ``json_path`` as the indented JSON array the app
+    has always read, byte for byte what json.dump(matches, f, indent=2)
+    writes, without building the list first. The file is replaced
+    atomically.
+
+    Returns:
+        int: Matches written.
+    """
+    count = 0
+
+    def write(f):
+        nonlocal count
+        for match in matches:
+            body = json.dumps(match, indent=2).replace('\n', '\n  ')
+            f.write(('[\n  ' if count == 0 else ',\n  ') + body)
+            count += 1
+        f.write('\n]' if count else '[]')
+
+    _write_atomic(json_path, write)
+    return count
+
+
+def ensure_ndjson(json_path):
+    """
+    Builds the NDJSON copy of ``json_path`` if it has no manifest yet.
+
+    Returns:
+        bool: True if it was written.
+    """
+    if read_manifest(json_path) is not None or not os.path.exists(json_path):
+        return False
+    with open(json_path, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    by_season = {}
+    for match in matches:
+        by_season.setdefault(match['season'], []).append(match)
+    with SeasonWriter(json_path) as writer:
+        for season_str, season_matches in by_season.items():
+            writer.write_season(season_str, season_matches)
+    return True
+
+
+if __name__ == "__main__":
+    # Build the NDJSON copy of the current dataset without re-scraping
+    PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    OUTPUT_JSON_FILE = os.path.join(PROJECT_ROOT, 'src/data/matches-all-seasons.json')
+
+    if ensure_ndjson(OUTPUT_JSON_FILE):
+        print(f"Wrote {ndjson_path(OUTPUT_JSON_FILE)}")
+    else:
+        print(f"{ndjson_path(OUTPUT_JSON_FILE)} is up to date")
@@ -0,0 +1,104 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Fields of a match record that can be requested with ?fields=
+MATCH_FIELDS = ('id', 'homeTeam', 'awayTeam', 'homeScore', 'awayScore', 'homeWinProb', 'drawProb',
+                'awayWinProb', 'confidence', 'date', 'time', 'stadium', 'matchday', 'season', 'played')
+# Matches per page when no limit is given, and the largest limit accepted
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class MatchQuery:
+    """
+    Filters, page and projection for /api/matches.
+
+    Args:
+        season (str): Only this season, e.g. "2024-2025".
+        team (str): Only matches of this team, home or away (any spelling
+            the store's TeamRegistry resolves).
+        matchday (int): Only this matchday.
+        date_from, date_to (str | date): Inclusive date range.
+        cursor (str): next_cursor of the previous page.
+        limit (int): Matches per page (DEFAULT_PAGE_SIZE if None, at most
+            MAX_PAGE_SIZE).
+        fields (str): Comma-separated record fields to return (default all).
+
+    Raises:
+        ValueError: For an unknown field, a malformed cursor or a limit
+            above MAX_PAGE_SIZE.
+    """
+    def __init__(self, season=None, team=None, matchday=None, date_from=None, date_to=None,
+                 cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None):
+        self.season = season
+        self.team = team or None
+        self.matchday = matchday
+        self.date_from = pd.Timestamp(date_from).normalize() if date_from is not None else None
+        self.date_to = pd.Timestamp(date_to).normalize() if date_to is not None else None
+        self.limit = limit or DEFAULT_PAGE_SIZE
+        if self.limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be at most {MAX_PAGE_SIZE}")
+        # The cursor is the position in the dataset of the last match sent
+        try:
+            self.after = int(cursor) if cursor else -1
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        if fields:
+            self.fields = tuple(f.strip() for f in fields.split(',') if f.strip())
+            unknown = [f for f in self.fields if f not in MATCH_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown field(s) {unknown}, expected some of {list(MATCH_FIELDS)}")
+        else:
+            self.fields = None
+
+    def key(self):
+        dates = tuple(d.date().isoformat() if d is not None else None for d in (self.date_from, self.date_to))
+        return (self.season, self.team, self.matchday) + dates + (self.after, self.limit, self.fields)
+
+    def _mask(self, store):
+        df = store.df
+        mask = np.ones(len(df), dtype=bool)
+        if self.season is not None:
+            mask &= (df['season'] == self.season).to_numpy()
+        if self.team is not None:
+            team_id = store.registry.id(self.team)
+            if team_id is None:
+                return np.zeros(len(df), dtype=bool)
+            mask &= (df['homeId'].to_numpy() == team_id) | (df['awayId'].to_numpy() == team_id)
+        if self.matchday is not None:
+            mask &= (df['matchday'] == self.matchday).to_numpy()
+        # NaT compares False, so undated matches drop out of any date range
+        if self.date_from is not None:
+            mask &= (df['date'] >= self.date_from).to_numpy()
+        if self.date_to is not None:
+            mask &= (df['date'] <= self.date_to).to_numpy()
+        return mask
+
+    def page(self, store):
+        """
+        Runs the query against a MatchStore.
+
+        Returns:
+            dict: "matches" (this page, in dataset order), "total" (matches
+            matching the filters across all pages) and "next_cursor" (None
+            on the last page).
+        """
+        positions = np.flatnonzero(self._mask(store))
+        rest = positions[np.searchsorted(positions, self.after, side='right'):]
+        selected = rest[:self.limit]
+
+        records = store.records
+        if self.fields is None:
+            matches = [records[i] for i in selected]
+        else:
+            matches = [{f: records[i].get(f) for f in self.fields} for i in selected]
+        return {
+            "matches": matches,
+            "total": int(len(positions)),
+            "next_cursor": str(selected[-1]) if len(rest) > self.limit else None
+        }
+
+    def render(self, store):
+        """The page serialized once, ready to be cached and sent as is."""
+        return json.dumps(self.page(store), ensure_ascii=False, separators=(",", ":")).encode('utf-8')
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from match_columns import read_columns, decode_records
+from team_registry import TeamRegistry
+from team_windows import TeamWindowIndex
+
+
+class MatchStore:
+    """
+    Single in-memory copy of the match dataset.
+
+    The dataset is loaded once and team names are resolved once, through
+    a TeamRegistry, to their canonical spelling. The raw records (served
+    by /api/matches) and a columnar DataFrame (used by RecentFormAnalyzer
+    and PoissonPerformanceModel) are built from that one load and shared
+    by every consumer instead of each re-reading the file. The frame also
+    carries the registry ids of both teams (homeId / awayId).
+    """
+    def __init__(self, records, source_path=None, version=None):
+        """
+        Args:
+            records (list): Match dicts as written by scraper.py.
+            source_path (str): Optional path the records were loaded from.
+            version (str): Identifier of this data snapshot (content hash of
+                the source file). Caches key on it.
+        """
+        self.source_path = source_path
+        self.version = version
+        self.registry = TeamRegistry([m.get(side) for m in records for side in ('homeTeam', 'awayTeam')])
+        self._records = self._clean_records(records, self.registry)
+        self._team_index = None
+        self.df = self._build_frame()
+
+    @classmethod
+    def from_file(cls, data_path):
+        """
+        Loads a matches JSON file into a new store. If the scraper's
+        columnar copy of that file exists and is up to date it is used
+        instead, skipping JSON parsing.
+        """
+        if not os.path.exists(data_path):
+            raise FileNotFoundError(f"Data file not found at {data_path}")
+
+        loaded = read_columns(data_path)
+        if loaded is not None:
+            return cls.from_columns(*loaded, source_path=data_path)
+
+        with open(data_path, 'rb') as f:
+            raw = f.read()
+        version = hashlib.sha1(raw).hexdigest()[:16]
+        return cls(json.loads(raw.decode('utf-8')), source_path=data_path, version=version)
+
+    @classmethod
+    def from_columns(cls, columns, meta, source_path=None):
+        """
+        Builds a store from match_columns arrays; the record dicts are only
+        decoded if something asks for them.
+
+        The numeric frame columns (team ids, scores, date, matchday,
+        played) are the memory-mapped arrays themselves, not copies, so
+        every process that loads the same snapshot shares them through the
+        page cache. The team name and season columns are Python strings and
+        are built per process, as is everything derived from the frame
+        (team index, aggregates, model fits). Workers only share those when
+        they are forked after the load (see gunicorn.conf.py); after a
+        refresh each worker builds its own.
+        """
+        store = cls.__new__(cls)
+        store.source_path = source_path
+        store.version = meta["source_hash"][:16]
+        store._columns = (columns, meta)
+        store._records = None
+        store._team_index = None
+
+        # The file stores registry ids, so team work is array indexing
+        store.registry = TeamRegistry(meta["teams"])
+        home_id = columns["home_id"]
+        away_id = columns["away_id"]
+        if store.registry.names != tuple(meta["teams"]):
+            remap = store.registry.ids(meta["teams"])
+            home_id, away_id = remap[home_id], remap[away_id]
+        teams = np.array(store.registry.names, dtype=object)
+        seasons = np.array(meta["seasons"], dtype=object)
+        store.df = pd.DataFrame({
+            "homeTeam": teams[home_id],
+            "awayTeam": teams[away_id],
+            "homeId": home_id,
+            "awayId": away_id,
+            "homeScore": columns["home_score"],
+            "awayScore": columns["away_score"],
+            "date": columns["date"],
+            "matchday": columns["matchday"],
+            "season": seasons[columns["season_id"]],
+            "played": columns["played"],
+        }, copy=False)
+        return store
+
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = self._clean_records(decode_records(*self._columns), self.registry)
+        return self._records
+
+    @property
+    def team_index(self):
+        """
+        TeamWindowIndex over this dataset, built on first use and shared by
+        the form analyzer and the Poisson model.
+        """
+        if self._team_index is None:
+            df = self.df
+            self._team_index = TeamWindowIndex(
+                df['homeId'], df['awayId'], df['homeScore'], df['awayScore'], df['date'],
+                df['season'] if 'season' in df.columns else None,
+                played=df['played'], team_names=self.registry.names
+            )
+        return self._team_index
+
+    @staticmethod
+    def _clean_records(records, registry):
+        for m in records:
+            if m.get('homeTeam'):
+                m['homeTeam'] = registry.resolve(m['homeTeam'])
+            if m.get('awayTeam'):
+                m['awayTeam'] = registry.resolve(m['awayTeam'])
+        return records
+
+    def _build_frame(self):
+        df = pd.DataFrame(self._records)
+        df['homeId'] = self.registry.ids(df['homeTeam'].tolist())
+        df['awayId'] = self.registry.ids(df['awayTeam'].tolist())
+        if 'date' in df.columns:
+            # records keep the ISO strings, the frame gets parsed dates
+            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+        # Older files have no flag and only contain played matches
+        df['played'] = df['played'].fillna(True).astype(bool) if 'played' in df.columns else True
+        return df
+
+    def played(self):
+        """
+        Matches with a final score, i.e. without fixtures still to be played
+        (those are stored with a 0-0 placeholder score).
+        """
+        return self.df[self.df['played']]
+
+    def teams(self):
+        """
+        Sorted names of every team in the dataset.
+        """
+        return list(self.registry.names)
+
+    def __len__(self):
+        return len(self.df)
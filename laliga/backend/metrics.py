@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+
+# Histogram buckets in seconds, from sub-millisecond lookups to full refreshes
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name -> (type, help) for everything the backend records. Metrics only show
+# up in /metrics once they have a value.
+METRICS = {
+    "laliga_startup_seconds": ("histogram", "Time to load the first engine when a worker starts."),
+    "laliga_data_load_seconds": ("histogram", "Time spent loading the dataset into an engine, by stage."),
+    "laliga_predict_stage_seconds": ("histogram", "Time per prediction stage; poisson_analysis is per fixture, the rest per uncached batch."),
+    "laliga_analyzer_seconds": ("histogram", "Time per analyzer call."),
+    "laliga_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "laliga_cache_hit_ratio": ("gauge", "Hits / lookups since start, by cache."),
+    "laliga_predictions_total": ("counter", "Fixtures predicted (cached or not)."),
+    "laliga_scraper_season_seconds": ("gauge", "Time to load each season in the last scraper run."),
+    "laliga_scraper_seasons_total": ("counter", "Seasons loaded by the scraper, by result."),
+    "laliga_scraper_run_seconds": ("histogram", "Duration of full scraper runs."),
+    "laliga_scraper_fetches_total": ("counter", "Page requests made by the scraper, by HTTP status (error if none)."),
+    "laliga_refresh_stage_seconds": ("histogram", "Time per /api/refresh stage."),
+    "laliga_refresh_total": ("counter", "Finished refresh jobs by result."),
+    "laliga_http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "laliga_http_request_seconds": ("histogram", "HTTP request latency by route."),
+    "laliga_matches_loaded": ("gauge", "Matches in the dataset the API is serving."),
+    "laliga_prediction_cache_entries": ("gauge", "Entries in the prediction cache."),
+    "laliga_rejected_requests_total": ("counter", "Requests answered with 429 because the endpoint's queue was full."),
+    "laliga_endpoint_pending": ("gauge", "Calls running or queued on the work pool, by endpoint."),
+}
+
+
+class _Timer:
+    # Plain class instead of contextlib: this sits on hot paths
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus
+    text format. Recording is a dict update under a lock (a few
+    microseconds), so instrumentation can stay on in production.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                state = series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += seconds
+            state[2] += 1
+
+    def time(self, name, **labels):
+        """
+        Context manager recording the duration of its block in histogram ``name``.
+        """
+        return _Timer(self, name, labels)
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge series (0 if unset)."""
+        key = self._key(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if name in store:
+                    return store[name].get(key, 0)
+        return 0
+
+    def add_collector(self, collect):
+        """
+        Registers a callable run at render time that returns
+        {gauge name: {labels dict as tuple of pairs: value}}, for values
+        that are cheaper to read on scrape than to keep updated.
+        """
+        self._collectors.append(collect)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        gauges = {}
+        for collect in self._collectors:
+            for name, series in collect().items():
+                gauges.setdefault(name, {}).update(series)
+
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            for name, series in self._gauges.items():
+                gauges.setdefault(name, {}).update(series)
+            histograms = {name: {key: (list(state[0]), state[1], state[2]) for key, state in series.items()}
+                          for name, series in self._histograms.items()}
+
+        lines = []
+        for name in sorted(set(counters) | set(gauges) | set(histograms)):
+            kind, help_text = METRICS.get(name, (None, name))
+            kind = kind or ("counter" if name in counters else "gauge" if name in gauges else "histogram")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if name in histograms:
+                for key, (counts, total, count) in sorted(histograms[name].items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {total!r}")
+                    lines.append(f"{name}_count{_labels(key)} {count}")
+            else:
+                series = counters.get(name) or gauges.get(name, {})
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    if not key:
+        return ""
+    pairs = []
+    for name, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _cache_hit_ratios(registry):
+    with registry._lock:
+        lookups = dict(registry._counters.get("laliga_cache_requests_total", {}))
+    totals = {}
+    for key, count in lookups.items():
+        labels = dict(key)
+        hits, total = totals.get(labels.get("cache"), (0, 0))
+        totals[labels.get("cache")] = (hits + (count if labels.get("result") == "hit" else 0), total + count)
+    return {"laliga_cache_hit_ratio": {(("cache", cache),): hits / total
+                                       for cache, (hits, total) in totals.items() if total}}
+
+
+# Process-wide registry used by the engine, the scraper and the API
+REGISTRY = MetricsRegistry()
+REGISTRY.add_collector(lambda: _cache_hit_ratios(REGISTRY))
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.time
@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
 import json
 import os
+from match_store import MatchStore
+from team_windows import CUMULATIVE_FIELDS
+from metrics import timer
 
 class PoissonPerformanceModel:
     def __init__(self, data_path):
@@ -8,30 +12,135 @@ class PoissonPerformanceModel:
         Initialize the model with match data.
         
         Args:
-            data_path (str): Absolute path to the matches JSON file.
+            data_path (str | MatchStore): Absolute path to the matches JSON file,
+                or an already loaded MatchStore to share.
         """
-        self.data_path = data_path
-        self.df = self._load_and_clean_data()
+        if isinstance(data_path, MatchStore):
+            self.data_path = data_path.source_path
+            self.store = data_path
+        else:
+            self.data_path = data_path
+            self.store = self._load_and_clean_data()
+        self.df = self.store.df
+        self._build_aggregates()
 
     def _load_and_clean_data(self):
         """
-        Loads the JSON data into a pandas DataFrame and cleans team names.
+        Loads the match data into a MatchStore with cleaned team names.
+        Uses the scraper's columnar copy of the JSON file when present.
         """
         if not os.path.exists(self.data_path):
             raise FileNotFoundError(f"Data file not found at {self.data_path}")
             
-        with open(self.data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        df = pd.DataFrame(data)
-        
-        # Clean team names (remove newlines and extra whitespace)
-        df['homeTeam'] = df['homeTeam'].str.replace(r'\n', ' ', regex=True).str.strip()
-        df['awayTeam'] = df['awayTeam'].str.replace(r'\n', ' ', regex=True).str.strip()
+        return MatchStore.from_file(self.data_path)
+
+    def _build_aggregates(self):
+        """
+        Computes per-team home and away aggregates with a single groupby over
+        a long (team, venue) view of the matches. Queries become array lookups.
+        Fixtures not played yet are left out.
+        """
+        df = self.store.played()
+        registry = self.store.registry
+        # Grouped on registry ids (sorted ids = sorted names)
+        long = pd.DataFrame({
+            'team': pd.concat([df['homeId'], df['awayId']], ignore_index=True),
+            'venue': np.repeat(['home', 'away'], len(df)),
+            'scored': pd.concat([df['homeScore'], df['awayScore']], ignore_index=True),
+            'conceded': pd.concat([df['awayScore'], df['homeScore']], ignore_index=True)
+        })
+        grouped = long.groupby(['team', 'venue']).agg(
+            played=('scored', 'size'),
+            avg_scored=('scored', 'mean'),
+            avg_conceded=('conceded', 'mean')
+        ).unstack('venue')
+
+        # One row per team; columns like home_played, away_avg_scored
+        grouped.columns = [f"{venue}_{stat}" for stat, venue in grouped.columns]
+        table = grouped.reindex(columns=[
+            'home_played', 'home_avg_scored', 'home_avg_conceded',
+            'away_played', 'away_avg_scored', 'away_avg_conceded'
+        ])
+        table[['home_played', 'away_played']] = table[['home_played', 'away_played']].fillna(0).astype(int)
+        ids = table.index.to_numpy(dtype=np.int64)
+        table.index = pd.Index([registry.names[i] for i in ids])
+        self.team_table = table
+
+        # Arrays for lookups indexed by registry id (zero / NaN for a team
+        # without played matches)
+        def by_id(column, fill):
+            values = np.full(len(registry), fill, dtype=table[column].dtype)
+            values[ids] = table[column].to_numpy()
+            return values
+
+        self._home_played = by_id('home_played', 0)
+        self._home_scored = by_id('home_avg_scored', np.nan)
+        self._home_conceded = by_id('home_avg_conceded', np.nan)
+        self._away_played = by_id('away_played', 0)
+        self._away_scored = by_id('away_avg_scored', np.nan)
+        self._away_conceded = by_id('away_avg_conceded', np.nan)
+
+    def get_team_aggregates(self):
+        """
+        Home/away aggregates for every team at once.
+
+        Returns:
+            dict: Team name -> {"home_played", "home_avg_scored", ...}.
+        """
+        return self.team_table.to_dict(orient='index')
+
+    def get_lambda_matrix(self):
+        """
+        Poisson λ for every home/away pair at once.
+
+        Returns:
+            tuple: (teams, lambda_home, lambda_away) where the matrices are
+            indexed [home_team, away_team] in the order of ``teams``. Pairs
+            without home or away data are NaN.
+        """
+        lambda_home, lambda_away = self.expected_goals(
+            self._home_scored[:, None], self._home_conceded[:, None],
+            self._away_scored[None, :], self._away_conceded[None, :]
+        )
+        return list(self.store.registry.names), lambda_home, lambda_away
+
+    @staticmethod
+    def expected_goals(home_avg_scored, home_avg_conceded, away_avg_scored, away_avg_conceded):
+        """
+        Poisson λ from home-only and away-only averages. Works on scalars
+        or arrays (the backtester passes arrays).
+        """
+        # λ_home = (Home team home goals scored avg) × (Away team away goals conceded avg)
+        lambda_home = home_avg_scored * away_avg_conceded
         
-        return df
+        # λ_away = (Away team away goals scored avg) × (Home team home goals conceded avg)
+        lambda_away = away_avg_scored * home_avg_conceded
+        return lambda_home, lambda_away
+
+    def _side_stats(self, team, side, window=None):
+        """
+        (matches played, avg goals scored, avg goals conceded) for a team's
+        home or away matches. The full history reads the precomputed arrays;
+        other windows use the team index's cached per-window totals.
+        """
+        i = self.store.registry.id(team)
+        if i is None:
+            return 0, None, None
+        if window is None or window.is_full:
+            if not (self._home_played[i] if side == 'home' else self._away_played[i]):
+                return 0, None, None
+            if side == 'home':
+                return int(self._home_played[i]), self._home_scored[i], self._home_conceded[i]
+            return int(self._away_played[i]), self._away_scored[i], self._away_conceded[i]
 
-    def get_performance_stats(self, home_team, away_team):
+        row = self.store.team_index.aggregate_table(window)[i]
+        played = int(row[CUMULATIVE_FIELDS.index(f'{side}_played')])
+        if played == 0:
+            return 0, None, None
+        return (played, row[CUMULATIVE_FIELDS.index(f'{side}_goals_for')] / played,
+                row[CUMULATIVE_FIELDS.index(f'{side}_goals_against')] / played)
+
+    def get_performance_stats(self, home_team, away_team, window=None):
         """
         Calculates home stats for the home team and away stats for the away team,
         then computes Poisson lambda values.
@@ -39,40 +148,36 @@ class PoissonPerformanceModel:
         Args:
             home_team (str): Name of the home team.
             away_team (str): Name of the away team.
+            window (Window): Optional as-of date / season range / rolling
+                window to average over. Defaults to every season.
             
         Returns:
             dict: Structured data containing team stats and calculated lambdas.
         """
-        # Normalize inputs
-        home_team = home_team.strip()
-        away_team = away_team.strip()
+        with timer('laliga_analyzer_seconds', method='get_performance_stats'):
+            return self._performance_stats(home_team, away_team, window)
+
+    def _performance_stats(self, home_team, away_team, window):
+        # Normalize inputs (whitespace, accents, known aliases)
+        home_team = self.store.registry.resolve(home_team)
+        away_team = self.store.registry.resolve(away_team)
 
         # 1. Home team performance only in home matches
-        home_matches = self.df[self.df['homeTeam'] == home_team]
-        home_played = len(home_matches)
+        home_played, home_avg_scored, home_avg_conceded = self._side_stats(home_team, 'home', window)
         
         if home_played == 0:
             return {"error": f"No home match data found for team: {home_team}"}
-            
-        home_avg_scored = home_matches['homeScore'].mean()
-        home_avg_conceded = home_matches['awayScore'].mean()
 
         # 2. Away team performance only in away matches
-        away_matches = self.df[self.df['awayTeam'] == away_team]
-        away_played = len(away_matches)
+        away_played, away_avg_scored, away_avg_conceded = self._side_stats(away_team, 'away', window)
         
         if away_played == 0:
             return {"error": f"No away match data found for team: {away_team}"}
-            
-        away_avg_scored = away_matches['awayScore'].mean()
-        away_avg_conceded = away_matches['homeScore'].mean()
 
         # 3. Calculate Poisson λ (expected goals)
-        # λ_home = (Home team home goals scored avg) × (Away team away goals conceded avg)
-        lambda_home = home_avg_scored * away_avg_conceded
-        
-        # λ_away = (Away team away goals scored avg) × (Home team home goals conceded avg)
-        lambda_away = away_avg_scored * home_avg_conceded
+        lambda_home, lambda_away = self.expected_goals(
+            home_avg_scored, home_avg_conceded, away_avg_scored, away_avg_conceded
+        )
 
         return {
             "home_team_stats": {
@@ -1,54 +1,160 @@
-import json
+import hashlib
 import os
-import math
-from datetime import datetime
+import threading
+from collections import OrderedDict
+import numpy as np
+from match_store import MatchStore
+from team_registry import TeamRegistry
+from score_grid import ScoreGrid, DEFAULT_MAX_GOALS, grid_markets, score_matrices
 from form_analyzer import RecentFormAnalyzer
 from poisson_model import PoissonPerformanceModel
+from team_windows import Window, FULL_WINDOW
+from simulator import SeasonSimulator, DEFAULT_SIMULATIONS
+from dixon_coles import DixonColesModel
+from metrics import inc, timer
 
 # Adjust path to match your project structure
 # Assuming this file is in laliga/backend/predictor.py
 # and data is in laliga/src/data
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_FILE = os.path.join(PROJECT_ROOT, 'src/data/matches-all-seasons.json')
+# Recent-form spans: the model uses the last 10 matches, the UI shows the last 5
+MODEL_FORM_MATCHES = 10
+UI_FORM_MATCHES = 5
+# Cached predictions kept (every as-of date is its own window); least
+# recently used dropped first so hot fixtures stay cached
+PREDICTION_CACHE_LIMIT = 20000
+# "form": recent-form goal ratios against fixed league averages.
+# "dixon_coles": fitted attack/defence/home-advantage ratings (dixon_coles.py).
+PREDICTION_MODELS = ('form', 'dixon_coles')
+# Dixon-Coles fits kept for windows other than the full history
+FIT_CACHE_LIMIT = 16
+# Season simulation results kept (least recently used dropped first)
+SIMULATION_CACHE_LIMIT = 32
+# Serialized /api/matches pages kept (least recently used dropped first)
+MATCHES_CACHE_LIMIT = 256
+# Part of every disk cache key; bump when the content of predictions or
+# simulations changes so results stored by older code are never served
+DISK_CACHE_SCHEMA = 1
 
 class PredictionEngine:
-    def __init__(self):
-        self.matches = []
-        if os.path.exists(DATA_FILE):
+    def __init__(self, data_file=DATA_FILE, max_goals=DEFAULT_MAX_GOALS, model='form', warm_start=None,
+                 disk_cache=None):
+        """
+        Args:
+            data_file (str): Matches JSON file.
+            max_goals (int): Goals per side covered by the score grids.
+            model (str): Lambda model, one of PREDICTION_MODELS.
+            warm_start (DixonColesModel): Previous fit to start the
+                Dixon-Coles fit from (see rebuild).
+            disk_cache (DiskCache): Optional persistent cache behind the
+                in-memory prediction and simulation caches, so results
+                survive restarts and are shared between workers.
+        """
+        if model not in PREDICTION_MODELS:
+            raise ValueError(f"Unknown model {model!r}, expected one of {PREDICTION_MODELS}")
+        self.data_file = data_file
+        self.max_goals = max_goals
+        self.model = model
+        self.warm_start = warm_start
+        self.disk_cache = disk_cache
+        self._disk_namespace = None
+        self.store = None
+        self.analyzer = None
+        self.poisson_model = None
+        self.dixon_coles = None
+        self._fit_cache = OrderedDict()
+        self.data_version = None
+        self.data_modified = None
+        self.registry = TeamRegistry(())
+        # (home id, away id, (data_version, window key)) -> prediction; replaced wholesale on reload
+        self._prediction_cache = OrderedDict()
+        # Guards the LRU bookkeeping of the caches, which pool threads share
+        # (only the dict operations, never the computations)
+        self._cache_lock = threading.Lock()
+        self._simulation_cache = OrderedDict()
+        self._matches_cache = OrderedDict()
+        if os.path.exists(self.data_file):
             self.load_data()
-            self.analyzer = RecentFormAnalyzer(DATA_FILE)
-            self.poisson_model = PoissonPerformanceModel(DATA_FILE)
         else:
-            print(f"Error: Data file {DATA_FILE} not found. Prediction will be limited.")
+            print(f"Error: Data file {self.data_file} not found. Prediction will be limited.")
+
+    def load_data(self):
+        if not os.path.exists(self.data_file):
+            print(f"Warning: Data file not found at {self.data_file}")
+            self.store = None
             self.analyzer = None
             self.poisson_model = None
+            self.dixon_coles = None
+            self._fit_cache = OrderedDict()
+            self.data_version = None
+            self.data_modified = None
+            self.registry = TeamRegistry(())
+            self._prediction_cache = OrderedDict()
+            self._simulation_cache = OrderedDict()
+            self._matches_cache = OrderedDict()
+            return
 
-    def load_data(self):
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                self.matches = json.load(f)
-        else:
-            print(f"Warning: Data file not found at {DATA_FILE}")
-            self.matches = []
-        
-        # Re-initialize analyzer if data is reloaded
-        if hasattr(self, 'analyzer'):
-            self.analyzer = RecentFormAnalyzer(DATA_FILE)
-        
-        if hasattr(self, 'poisson_model') and os.path.exists(DATA_FILE):
-             self.poisson_model = PoissonPerformanceModel(DATA_FILE)
+        # Parse and clean the dataset once; the analyzer and the Poisson model
+        # share the same columnar frame instead of re-reading the JSON.
+        with timer('laliga_data_load_seconds', stage='total'):
+            with timer('laliga_data_load_seconds', stage='match_store'):
+                store = MatchStore.from_file(self.data_file)
+            with timer('laliga_data_load_seconds', stage='form_analyzer'):
+                analyzer = RecentFormAnalyzer(store)
+            with timer('laliga_data_load_seconds', stage='poisson_model'):
+                poisson_model = PoissonPerformanceModel(store)
+            dixon_coles = None
+            if self.model == 'dixon_coles':
+                # Starting from the previous ratings, a refit after new results
+                # only takes a few sweeps
+                with timer('laliga_data_load_seconds', stage='dixon_coles'):
+                    dixon_coles = DixonColesModel.from_store(store, warm_start=self.warm_start or self.dixon_coles)
+
+        # Everything is built before any attribute changes. For a reload
+        # under live traffic prefer rebuild() and swapping the engine.
+        self.store = store
+        self.analyzer = analyzer
+        self.poisson_model = poisson_model
+        self.dixon_coles = dixon_coles
+        self._fit_cache = OrderedDict()
+        # Built once per load: the sorted team list and name -> id lookups
+        self.registry = store.registry
+        self.data_version = store.version
+        # Disk cache keys start with a hash of everything a result depends on
+        self._disk_namespace = hashlib.sha1(repr((
+            DISK_CACHE_SCHEMA, self.data_version, self.model, self.max_goals,
+            MODEL_FORM_MATCHES, UI_FORM_MATCHES
+        )).encode('utf-8')).hexdigest()[:16]
+        # Last-Modified of /api/matches
+        self.data_modified = os.path.getmtime(self.data_file)
+        # Swap in an empty cache in one assignment; entries computed from the
+        # previous data carry the old version in their key and are never hit.
+        self._prediction_cache = OrderedDict()
+        self._simulation_cache = OrderedDict()
+        self._matches_cache = OrderedDict()
+
+    def rebuild(self):
+        """
+        Returns a new engine with the same settings, loaded from the current
+        data file. This engine is left untouched, so callers can swap the
+        new one in atomically.
+        """
+        return PredictionEngine(self.data_file, self.max_goals, self.model, warm_start=self.dixon_coles,
+                                disk_cache=self.disk_cache)
+
+    @property
+    def matches(self):
+        # Record dicts are decoded lazily when loaded from the columnar copy
+        return self.store.records if self.store else []
 
     def get_teams(self):
-        teams = set()
-        for m in self.matches:
-            if m.get('homeTeam'): teams.add(m['homeTeam'])
-            if m.get('awayTeam'): teams.add(m['awayTeam'])
-        return sorted(list(teams))
+        return list(self.registry.names)
 
-    def get_team_stats(self, team, side=None, last_n=5):
+    def get_team_stats(self, team, side=None, last_n=5, window=None):
         # Use the specialized RecentFormAnalyzer for consistent stats
         if self.analyzer:
-            return self.analyzer.get_team_form(team, last_n)
+            return self.analyzer.get_team_form(team, last_n, window)
         return {
             "wins": 0, "draws": 0, "losses": 0,
             "goals_scored": 0, "goals_conceded": 0,
@@ -56,7 +162,44 @@ class PredictionEngine:
             "error": "Analyzer not initialized"
         }
 
-    def predict_match(self, home_team, away_team):
+    @staticmethod
+    def _form_rates(stats):
+        """
+        Goals scored and conceded per match from a form dict (NaN if no history).
+        """
+        played = len(stats.get('match_history', []))
+        if not played:
+            return (np.nan, np.nan)
+        return (stats['goals_scored'] / played, stats['goals_conceded'] / played)
+
+    def _expected_goals_many(self, home_stats, away_stats):
+        """
+        Poisson lambdas for many fixtures at once from both teams' recent-form stats.
+
+        Args:
+            home_stats (list): Form dicts of the home teams.
+            away_stats (list): Form dicts of the away teams, aligned with home_stats.
+
+        Returns:
+            tuple: (lambda_home, lambda_away) arrays.
+        """
+        home = np.array([self._form_rates(s) for s in home_stats], dtype=float).reshape(-1, 2)
+        away = np.array([self._form_rates(s) for s in away_stats], dtype=float).reshape(-1, 2)
+        return self.form_expected_goals(home, away)
+
+    @staticmethod
+    def form_expected_goals(home_rates, away_rates):
+        """
+        The recent-form lambda formula on arrays, shared with the backtester.
+
+        Args:
+            home_rates (np.ndarray): Shape (n, 2): home teams' goals scored and
+                conceded per match over their recent form (NaN if no history).
+            away_rates (np.ndarray): Same for the away teams.
+
+        Returns:
+            tuple: (lambda_home, lambda_away) arrays.
+        """
         # Poisson Distribution approach
         # 1. Calculate Average Goals for Home Team (home attack strength) vs Away Team (away defense weakness)
         
@@ -64,94 +207,325 @@ class PredictionEngine:
         avg_home_goals = 1.5
         avg_away_goals = 1.1
 
-        home_stats = self.get_team_stats(home_team, 'home', 10) # Look at last 10 for better sample
-        away_stats = self.get_team_stats(away_team, 'away', 10)
-        
-        # Actually RecentFormAnalyzer returns total goals. Let's adjust calculation.
-        n_home = len(home_stats.get('match_history', [])) or 1
-        n_away = len(away_stats.get('match_history', [])) or 1
-
         # Attack Strength: Team Avg Goals / League Avg Goals
         # Use 1.0 (Average) if no games played or missing data
-        home_attack = (home_stats['goals_scored'] / n_home / avg_home_goals) if avg_home_goals and home_stats.get('match_history') else 1.0
-        away_defense = (away_stats['goals_conceded'] / n_away / avg_home_goals) if avg_home_goals and away_stats.get('match_history') else 1.0
-        
-        away_attack = (away_stats['goals_scored'] / n_away / avg_away_goals) if avg_away_goals and away_stats.get('match_history') else 1.0
-        home_defense = (home_stats['goals_conceded'] / n_home / avg_away_goals) if avg_away_goals and home_stats.get('match_history') else 1.0
+        home_attack = np.nan_to_num(home_rates[:, 0] / avg_home_goals, nan=1.0)
+        away_defense = np.nan_to_num(away_rates[:, 1] / avg_home_goals, nan=1.0)
+
+        away_attack = np.nan_to_num(away_rates[:, 0] / avg_away_goals, nan=1.0)
+        home_defense = np.nan_to_num(home_rates[:, 1] / avg_away_goals, nan=1.0)
 
         # Expected Goals
         lambda_home = home_attack * away_defense * avg_home_goals
         lambda_away = away_attack * home_defense * avg_away_goals
+        return lambda_home, lambda_away
 
-        # Get fresh 5-game stats for UI display specifically
-        home_form_ui = self.get_team_stats(home_team, last_n=5)
-        away_form_ui = self.get_team_stats(away_team, last_n=5)
-        
-        # Simulation (Grid)
-        max_goals = 6
-        probs = {}
-        
-        def poisson(k, lam):
-            return (lam**k * math.exp(-lam)) / math.factorial(k)
+    def get_score_grid(self, home_team, away_team, window=None):
+        """
+        Score-probability matrix for a fixture. Exposes every market
+        (1X2, over/under at any line, BTTS, exact score, Asian handicap).
+        """
+        fixture = [(self.registry.resolve(home_team), self.registry.resolve(away_team))]
+        lambda_home, lambda_away = self.fixture_lambdas(fixture, window)
+        matrix = self._score_matrices(lambda_home, lambda_away, window)[0]
+        return ScoreGrid(lambda_home[0], lambda_away[0], self.max_goals, matrix=matrix)
 
-        home_win_p = 0
-        draw_p = 0
-        away_win_p = 0
-        
-        most_likely_score = (0, 0)
-        max_prob = 0
-
-        for i in range(max_goals): # Home goals
-            for j in range(max_goals): # Away goals
-                p = poisson(i, lambda_home) * poisson(j, lambda_away)
-                if i > j:
-                    home_win_p += p
-                elif i == j:
-                    draw_p += p
-                else:
-                    away_win_p += p
-                
-                if p > max_prob:
-                    max_prob = p
-                    most_likely_score = (i, j)
-
-        # Calculate Over 1.5, Over 2.5, and BTTS probabilities
-        over_1_5_p = 0
-        over_2_5_p = 0
-        btts_p = 0
-
-        for i in range(max_goals): # Home goals
-            for j in range(max_goals): # Away goals
-                p = poisson(i, lambda_home) * poisson(j, lambda_away)
-                total_goals = i + j
-                if total_goals > 1.5:
-                    over_1_5_p += p
-                if total_goals > 2.5:
-                    over_2_5_p += p
-                if i >= 1 and j >= 1:
-                    btts_p += p
-
-        # Normalize probs
-        total = home_win_p + draw_p + away_win_p
-        if total > 0:
-            home_win_p /= total
-            draw_p /= total
-            away_win_p /= total
-
-        # Also normalize the goal probabilities relative to the same 6x6 grid total
-        # though poisson sums to 1.0 eventually, 6x6 is a good approximation
-        grid_total = sum(poisson(i, lambda_home) * poisson(j, lambda_away) 
-                         for i in range(max_goals) for j in range(max_goals))
-        
-        if grid_total > 0:
-            over_1_5_p /= grid_total
-            over_2_5_p /= grid_total
-            btts_p /= grid_total
+    def predict_match(self, home_team, away_team, window=None):
+        return self.predict_many([(home_team, away_team)], window)[0]
+
+    def warm_cache(self, season=None):
+        """
+        Fills the prediction cache for every home/away pair of a season.
+
+        Args:
+            season (str): Season such as "2024-2025". Defaults to the latest
+                season in the dataset.
+
+        Returns:
+            int: Number of pairs now cached.
+        """
+        if not self.store:
+            return 0
+        df = self.store.df
+        if season is None:
+            season = df['season'].max()
+        in_season = df[df['season'] == season]
+        teams = sorted(set(in_season['homeTeam']) | set(in_season['awayTeam']))
+        pairs = [(home, away) for home in teams for away in teams if home != away]
+        self.predict_many(pairs)
+        return len(pairs)
+
+    def simulate_season(self, season=None, as_of=None, n_sims=DEFAULT_SIMULATIONS, seed=0, workers=1):
+        """
+        Final-table probabilities for a season (see SeasonSimulator).
+
+        Results are cached per data version, season, as-of date, number of
+        simulations and seed; the worker count doesn't change the result.
+        """
+        key = (self.data_version, season, Window(as_of=as_of).key(), n_sims, seed)
+        cache = self._simulation_cache
+        with self._cache_lock:
+            result = cache.get(key)
+            if result is not None:
+                cache.move_to_end(key)
+        if result is not None:
+            inc('laliga_cache_requests_total', cache='simulation', result='hit')
+            return result
+
+        inc('laliga_cache_requests_total', cache='simulation', result='miss')
+        disk_key = self._disk_key('simulation', key)
+        if disk_key is not None:
+            result = self.disk_cache.get(disk_key)
+            inc('laliga_cache_requests_total', cache='simulation_disk', result='miss' if result is None else 'hit')
+        if result is None:
+            with timer('laliga_predict_stage_seconds', stage='simulate_season'):
+                result = SeasonSimulator(self, season, as_of).run(n_sims, seed, workers)
+            if disk_key is not None:
+                self.disk_cache.set(disk_key, result)
+        self._cache_insert(cache, [(key, result)], SIMULATION_CACHE_LIMIT)
+        return result
+
+    def matches_etag(self, query):
+        """
+        ETag of a /api/matches page: a hash of the data version and the
+        query, so it can be checked without building the page.
+        """
+        digest = hashlib.sha1(repr((self.data_version, query.key())).encode('utf-8')).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def matches_page(self, query, build=True):
+        """
+        One page of /api/matches (see MatchQuery) as UTF-8 JSON bytes.
+        Pages are serialized once per data version and query and then
+        served from the cache.
+
+        Args:
+            build (bool): If False, only look in the cache and return None
+                on a miss (lets the API answer hits without a worker).
+        """
+        if not self.store:
+            return b'{"matches":[],"total":0,"next_cursor":null}'
+
+        key = (self.data_version, query.key())
+        cache = self._matches_cache
+        # Hits are served from the event loop while pool threads insert
+        with self._cache_lock:
+            body = cache.get(key)
+            if body is not None:
+                cache.move_to_end(key)
+        if body is not None:
+            inc('laliga_cache_requests_total', cache='matches', result='hit')
+            return body
+        if not build:
+            return None
+
+        inc('laliga_cache_requests_total', cache='matches', result='miss')
+        with timer('laliga_predict_stage_seconds', stage='matches_page'):
+            body = query.render(self.store)
+        self._cache_insert(cache, [(key, body)], MATCHES_CACHE_LIMIT)
+        return body
+
+    def predict_many(self, fixtures, window=None):
+        """
+        Predicts a list of fixtures (e.g. a matchday or a full season) in one pass.
+
+        Team form is looked up once per team rather than once per fixture,
+        lambdas are computed as arrays and every score grid is reduced in a
+        single vectorised pass.
+
+        Args:
+            fixtures (list): (home_team, away_team) pairs.
+            window (Window): Data the models may use: an as-of date and/or a
+                season range, plus an optional rolling ``last_n`` for the
+                Poisson averages (recent form keeps its 5/10 match spans).
+                Defaults to all history.
+
+        Returns:
+            list: One predict_match result per fixture, in input order.
+            Results for known teams are cached per data version and shared
+            between calls, so callers must not mutate them.
+        """
+        if not fixtures:
+            return []
+
+        window = window or FULL_WINDOW
+        cache = self._prediction_cache
+        version = (self.data_version, window.key())
+        # Names are resolved to registry ids once; the cache is keyed on the
+        # ids, and only real teams get a key so arbitrary names can't grow it
+        registry = self.registry
+        keys = []
+        names = []
+        for home, away in fixtures:
+            home_id, away_id = registry.id(home), registry.id(away)
+            known = home_id is not None and away_id is not None
+            keys.append((home_id, away_id, version) if known else None)
+            names.append((registry.names[home_id] if home_id is not None else registry.resolve(home),
+                          registry.names[away_id] if away_id is not None else registry.resolve(away)))
+        fixtures = names
+        with self._cache_lock:
+            results = []
+            for key in keys:
+                result = cache.get(key) if key is not None else None
+                if result is not None:
+                    cache.move_to_end(key)
+                results.append(result)
+        missing = [i for i, result in enumerate(results) if result is None]
+        inc('laliga_predictions_total', len(fixtures))
+        if len(missing) < len(fixtures):
+            inc('laliga_cache_requests_total', len(fixtures) - len(missing), cache='prediction', result='hit')
+        if not missing:
+            return results
+        inc('laliga_cache_requests_total', len(missing), cache='prediction', result='miss')
+
+        disk_keys = {}
+        if self.disk_cache is not None:
+            # Second level: results computed before a restart or by another worker
+            disk_keys = {i: self._disk_key('prediction', keys[i]) for i in missing if keys[i] is not None}
+            stored = self.disk_cache.get_many(disk_keys.values())
+            for i, disk_key in disk_keys.items():
+                result = stored.get(disk_key)
+                if result is not None:
+                    results[i] = result
+            self._cache_insert(cache, [(keys[i], results[i]) for i in disk_keys if results[i] is not None],
+                               PREDICTION_CACHE_LIMIT)
+            if stored:
+                inc('laliga_cache_requests_total', len(stored), cache='prediction_disk', result='hit')
+            if len(missing) > len(stored):
+                inc('laliga_cache_requests_total', len(missing) - len(stored), cache='prediction_disk', result='miss')
+            missing = [i for i in missing if results[i] is None]
+            if not missing:
+                return results
+
+        computed = self._predict_uncached([fixtures[i] for i in missing], window)
+        for i, result in zip(missing, computed):
+            results[i] = result
+        self._cache_insert(cache, [(keys[i], results[i]) for i in missing if keys[i] is not None],
+                           PREDICTION_CACHE_LIMIT)
+        if disk_keys:
+            self.disk_cache.set_many((disk_keys[i], results[i]) for i in missing if i in disk_keys)
+        return results
+
+    def cache_sizes(self):
+        """
+        Returns:
+            dict: Entries in each in-memory cache, e.g. for metrics.
+        """
+        with self._cache_lock:
+            return {
+                "prediction": len(self._prediction_cache),
+                "simulation": len(self._simulation_cache),
+                "matches": len(self._matches_cache),
+                "dixon_coles_fit": len(self._fit_cache),
+            }
+
+    def _cache_insert(self, cache, items, limit):
+        # Adds (key, value) pairs to an LRU cache, dropping the oldest entries beyond limit
+        with self._cache_lock:
+            for key, value in items:
+                cache[key] = value
+                cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def _disk_key(self, kind, key):
+        # None when there is no disk cache (or no data to key on)
+        if self.disk_cache is None or self._disk_namespace is None:
+            return None
+        return f"{self._disk_namespace}:{kind}:{key!r}"
+
+    def fixture_lambdas(self, fixtures, window=None):
+        """
+        Expected goals for many fixtures, as used by predict_many.
+
+        Args:
+            fixtures (list): (home_team, away_team) pairs.
+            window (Window): Data the form lookups may use. Defaults to all history.
+
+        Returns:
+            tuple: (lambda_home, lambda_away) arrays aligned with ``fixtures``.
+        """
+        if self.model == 'dixon_coles':
+            registry = self.registry
+            return self.get_dixon_coles(window).expected_goals_by_id(
+                registry.ids([home for home, _ in fixtures]), registry.ids([away for _, away in fixtures])
+            )
+
+        teams = {team for fixture in fixtures for team in fixture}
+        # Look at last 10 for better sample
+        form_model = {team: self.get_team_stats(team, last_n=MODEL_FORM_MATCHES, window=window) for team in teams}
+        return self._expected_goals_many(
+            [form_model[home] for home, _ in fixtures],
+            [form_model[away] for _, away in fixtures]
+        )
+
+    def get_dixon_coles(self, window=None):
+        """
+        Dixon-Coles fit for a window's as-of date and season range (its
+        last_n is not used). Fits other than the full history are warm
+        started from the main fit and cached.
+        """
+        if self.dixon_coles is None:
+            self.dixon_coles = DixonColesModel.from_store(self.store, warm_start=self.warm_start)
+        window = window or FULL_WINDOW
+        if window.as_of is None and window.season_from is None and window.season_to is None:
+            return self.dixon_coles
+
+        key = window.with_last_n(None).key()
+        cache = self._fit_cache
+        with self._cache_lock:
+            fit = cache.get(key)
+            if fit is not None:
+                cache.move_to_end(key)
+        inc('laliga_cache_requests_total', cache='dixon_coles_fit', result='miss' if fit is None else 'hit')
+        if fit is None:
+            # Windows without matches get average ratings (see DixonColesModel.fit)
+            with timer('laliga_predict_stage_seconds', stage='dixon_coles_fit'):
+                fit = DixonColesModel.from_store(self.store, window, warm_start=self.dixon_coles)
+            self._cache_insert(cache, [(key, fit)], FIT_CACHE_LIMIT)
+        return fit
+
+    def _score_matrices(self, lambda_home, lambda_away, window):
+        if self.model == 'dixon_coles':
+            return self.get_dixon_coles(window).score_matrices(lambda_home, lambda_away, self.max_goals)
+        return score_matrices(lambda_home, lambda_away, self.max_goals)
+
+    def _predict_uncached(self, fixtures, window):
+        teams = {team for fixture in fixtures for team in fixture}
+        # Last 5 are for UI display
+        with timer('laliga_predict_stage_seconds', stage='form_ui'):
+            form_ui = {team: self.get_team_stats(team, last_n=UI_FORM_MATCHES, window=window) for team in teams}
+
+        with timer('laliga_predict_stage_seconds', stage='lambdas'):
+            lambda_home, lambda_away = self.fixture_lambdas(fixtures, window)
+        with timer('laliga_predict_stage_seconds', stage='score_grid'):
+            markets = grid_markets(self._score_matrices(lambda_home, lambda_away, window))
+
+        results = []
+        with timer('laliga_predict_stage_seconds', stage='build_results'):
+            for i, (home_team, away_team) in enumerate(fixtures):
+                fixture_markets = {key: values[i].item() for key, values in markets.items()}
+                results.append(self._build_result(
+                    home_team, away_team, fixture_markets, form_ui[home_team], form_ui[away_team], window
+                ))
+        return results
+
+    def _build_result(self, home_team, away_team, markets, home_form_ui, away_form_ui, window):
+        home_win_p = markets['home_win']
+        draw_p = markets['draw']
+        away_win_p = markets['away_win']
+        over_1_5_p = markets['over_1_5']
+        over_2_5_p = markets['over_2_5']
+        btts_p = markets['btts']
+        with timer('laliga_predict_stage_seconds', stage='poisson_analysis'):
+            poisson_analysis = self._generate_poisson_analysis(
+                home_team, away_team, over_1_5_p, over_2_5_p, btts_p, window
+            )
 
         return {
             "home_team": home_team,
             "away_team": away_team,
-            "predicted_score": f"{most_likely_score[0]} - {most_likely_score[1]}",
+            "predicted_score": f"{markets['home_goals']} - {markets['away_goals']}",
             "probabilities": {
                 "home_win": round(home_win_p * 100, 1),
                 "draw": round(draw_p * 100, 1),
@@ -167,14 +541,15 @@ class PredictionEngine:
                 "home_form": home_form_ui,
                 "away_form": away_form_ui
             },
-            "poisson_analysis": self._generate_poisson_analysis(home_team, away_team, over_1_5_p, over_2_5_p, btts_p)
+            "poisson_analysis": poisson_analysis,
+            "window": window.to_dict()
         }
 
-    def _generate_poisson_analysis(self, home_team, away_team, over_1_5_p, over_2_5_p, btts_p):
+    def _generate_poisson_analysis(self, home_team, away_team, over_1_5_p, over_2_5_p, btts_p, window=None):
         if not self.poisson_model:
             return None
         
-        stats = self.poisson_model.get_performance_stats(home_team, away_team)
+        stats = self.poisson_model.get_performance_stats(home_team, away_team, window)
         if "error" in stats:
             return None
             
@@ -0,0 +1,188 @@
+import contextlib
+import os
+import threading
+import time
+import traceback
+from metrics import inc, timer
+
+# Seconds between checks of the published dataset version
+SNAPSHOT_POLL_SECONDS = 2.0
+
+
+class RefreshJob:
+    """
+    Runs data refreshes in a background thread, one at a time.
+
+    The new dataset is loaded into a complete new PredictionEngine built
+    off to the side, which is then handed to ``publish`` to be swapped in
+    with a single reference assignment. Requests served meanwhile keep
+    using the previous engine and never see a half-loaded one.
+    """
+    def __init__(self, run_scraper, build_engine, publish):
+        """
+        Args:
+            run_scraper (callable): Updates the data file; returns the list
+                of seasons that changed (empty when nothing did).
+            build_engine (callable): Returns a freshly loaded engine.
+            publish (callable): Receives the new engine to swap in.
+        """
+        self.run_scraper = run_scraper
+        self.build_engine = build_engine
+        self.publish = publish
+        self._lock = threading.Lock()
+        self._thread = None
+        self._job_count = 0
+        self._status = {"job_id": None, "state": "idle"}
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def start(self):
+        """
+        Starts a refresh unless one is already running.
+
+        Returns:
+            tuple: (started, status) where started is False if a refresh
+            was already in progress.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False, dict(self._status)
+            self._job_count += 1
+            self._status = {
+                "job_id": self._job_count,
+                "state": "running",
+                "started_at": time.time(),
+                "finished_at": None,
+                "changed_seasons": None,
+                "error": None
+            }
+            self._thread = threading.Thread(target=self._run, name="refresh-job", daemon=True)
+            self._thread.start()
+            return True, dict(self._status)
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.status()
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _run(self):
+        try:
+            with timer('laliga_refresh_stage_seconds', stage='scrape'):
+                changed = self.run_scraper()
+            if changed:
+                with timer('laliga_refresh_stage_seconds', stage='build_engine'):
+                    new_engine = self.build_engine()
+                with timer('laliga_refresh_stage_seconds', stage='warm_cache'):
+                    new_engine.warm_cache() # Precompute all pairs of the current season
+                self.publish(new_engine)
+            inc('laliga_refresh_total', result='succeeded')
+            self._update(state="succeeded", changed_seasons=changed, finished_at=time.time())
+        except BaseException as e:
+            # BaseException too: a SystemExit from the scraper must not leave
+            # the job "running" forever
+            traceback.print_exc()
+            inc('laliga_refresh_total', result='failed')
+            self._update(state="failed", error=str(e) or type(e).__name__, finished_at=time.time())
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Exclusive lock on ``path`` shared by every process on the host, so two
+    workers never scrape and rewrite the data files at the same time.
+    Without fcntl (Windows) it only runs the block.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SnapshotWatcher:
+    """
+    Keeps one worker in step with data published by another.
+
+    A refresh in any worker ends with a new columnar snapshot and its
+    version in the snapshot's CURRENT file. Every worker polls that file
+    and, when the version differs from the engine it serves, builds a new
+    engine from the memory-mapped snapshot (no JSON parsing), warms it and
+    swaps it in, the same way RefreshJob does.
+    """
+    def __init__(self, current_version, serving_version, build_engine, publish,
+                 interval=SNAPSHOT_POLL_SECONDS):
+        """
+        Args:
+            current_version (callable): Returns the published version (or None).
+            serving_version (callable): Returns the version being served,
+                None while no engine is loaded (nothing is done then).
+            build_engine (callable): Returns a freshly loaded engine.
+            publish (callable): Receives the new engine to swap in.
+            interval (float): Seconds between polls.
+        """
+        self.current_version = current_version
+        self.serving_version = serving_version
+        self.build_engine = build_engine
+        self.publish = publish
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._unusable = None # published version whose snapshot didn't load
+
+    def start(self):
+        # Threads don't survive a fork, so a preloaded master's watcher
+        # doesn't count for the workers
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._stop.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._loop, name="snapshot-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """
+        Swaps in the published version if it isn't the one being served.
+
+        Returns:
+            bool: True if a new engine was published.
+        """
+        published = self.current_version()
+        serving = self.serving_version()
+        if published is None or serving is None or published in (serving, self._unusable):
+            return False
+        with timer('laliga_refresh_stage_seconds', stage='follow_snapshot'):
+            new_engine = self.build_engine()
+            if new_engine.data_version != published:
+                # The JSON no longer matches the snapshot (e.g. edited by
+                # hand); don't rebuild for it again, wait for the next version
+                self._unusable = published
+                return False
+            new_engine.warm_cache()
+        self.publish(new_engine)
+        inc('laliga_refresh_total', result='followed')
+        print(f"Loaded dataset version {published} published by another worker")
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                traceback.print_exc()
@@ -0,0 +1,129 @@
+from html.parser import HTMLParser
+
+
+class _TableState:
+    """
+    Parse state shared between the document parser and the sub-parsers fed
+    with the contents of HTML comments (fbref comments out some tables).
+    """
+    def __init__(self):
+        self.table_depth = 0      # > 0 while inside the schedule table
+        self.found = False        # schedule table seen (only the first counts)
+        self.done = False         # schedule table closed
+        self.tbody_seen = False   # only the first tbody is read
+        self.in_tbody = False
+        self.row = None           # (classes, cells) of the open <tr>
+        self.cell_key = None      # (tag, data-stat) of the cell being read
+        self.cell_depth = 0
+        self.cell_text = None
+        self.rows = []
+
+
+class _ScheduleParser(HTMLParser):
+    """
+    Single-pass scanner for the fbref schedule table. Walks the document
+    once, and for every row of the table's first <tbody> maps each
+    td/th cell by its data-stat attribute to its stripped text.
+    """
+    def __init__(self, state):
+        super().__init__(convert_charrefs=True)
+        self.state = state
+
+    def handle_starttag(self, tag, attrs):
+        st = self.state
+        if st.done:
+            return
+        if tag == 'table':
+            if st.table_depth:
+                st.table_depth += 1
+            elif not st.found:
+                table_id = dict(attrs).get('id')
+                if table_id and 'sched' in table_id:
+                    st.found = True
+                    st.table_depth = 1
+            return
+        if not st.table_depth:
+            return
+
+        if tag == 'tbody' and not st.tbody_seen:
+            st.tbody_seen = True
+            st.in_tbody = True
+        elif not st.in_tbody:
+            return
+        elif tag == 'tr':
+            classes = (dict(attrs).get('class') or '').split()
+            st.row = (classes, {})
+        elif st.row is not None:
+            if st.cell_key is not None:
+                if tag == st.cell_key[0]:
+                    st.cell_depth += 1
+                return
+            if tag in ('td', 'th'):
+                stat = dict(attrs).get('data-stat')
+                key = (tag, stat)
+                # Only the first cell per (tag, data-stat) is used, like row.find
+                if stat is not None and key not in st.row[1]:
+                    st.cell_key = key
+                    st.cell_depth = 1
+                    st.cell_text = []
+
+    def handle_endtag(self, tag):
+        st = self.state
+        if st.done or not st.table_depth:
+            return
+        if tag == 'table':
+            st.table_depth -= 1
+            if not st.table_depth:
+                st.done = True
+            return
+        if st.cell_key is not None and tag == st.cell_key[0]:
+            st.cell_depth -= 1
+            if not st.cell_depth:
+                pieces = (piece.strip() for piece in st.cell_text)
+                st.row[1][st.cell_key] = ''.join(piece for piece in pieces if piece)
+                st.cell_key = None
+                st.cell_text = None
+        elif tag == 'tr' and st.row is not None:
+            st.rows.append(st.row)
+            st.row = None
+            st.cell_key = None
+        elif tag == 'tbody' and st.in_tbody:
+            st.in_tbody = False
+
+    def handle_data(self, data):
+        if self.state.cell_key is not None:
+            self.state.cell_text.append(data)
+
+    def handle_comment(self, data):
+        # Parse commented-out markup in place instead of re-serialising the
+        # whole document with the comment markers removed.
+        st = self.state
+        if st.done:
+            return
+        if '<' not in data:
+            self.handle_data(data)
+            return
+        sub = _ScheduleParser(st)
+        sub.feed(data)
+        sub.close()
+
+
+def extract_schedule_rows(content):
+    """
+    Extracts the rows of the first table whose id contains "sched".
+
+    Args:
+        content (str): Full HTML of an fbref "Scores & Fixtures" page.
+
+    Returns:
+        list | None: One (classes, cells) tuple per <tr>, where cells maps
+        (tag, data-stat) to the cell's text. None if no schedule table
+        with a <tbody> was found, so callers can fall back to another parser.
+    """
+    state = _TableState()
+    parser = _ScheduleParser(state)
+    parser.feed(content)
+    parser.close()
+    if not state.found or not state.tbody_seen:
+        return None
+    return state.rows
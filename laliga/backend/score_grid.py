@@ -0,0 +1,184 @@
+import numpy as np
+
+# Goals per side covered by the grid (0 .. DEFAULT_MAX_GOALS - 1). The old
+# 6x6 grid dropped several percent of the mass once a lambda went above ~2.5.
+DEFAULT_MAX_GOALS = 10
+
+
+def poisson_pmf(lam, max_goals=DEFAULT_MAX_GOALS):
+    """
+    Poisson probabilities P(k) for k = 0 .. max_goals - 1.
+
+    Args:
+        lam (float | array): Expected goals. An array of shape (n,) returns
+            an (n, max_goals) array, one PMF row per lambda.
+        max_goals (int): Number of goal counts to cover.
+
+    Returns:
+        np.ndarray: PMF vector(s), built with the recurrence
+        P(k) = P(k-1) * lam / k instead of factorials.
+    """
+    lam = np.asarray(lam, dtype=float)
+    steps = np.empty(lam.shape + (max_goals,))
+    steps[..., 0] = np.exp(-lam)
+    steps[..., 1:] = lam[..., None] / np.arange(1, max_goals)
+    return np.cumprod(steps, axis=-1)
+
+
+def score_matrices(lambda_home, lambda_away, max_goals=DEFAULT_MAX_GOALS):
+    """
+    Score-probability matrices for many fixtures at once.
+
+    Args:
+        lambda_home (array): Home expected goals, shape (n,).
+        lambda_away (array): Away expected goals, shape (n,).
+        max_goals (int): Goals per side covered by each grid.
+
+    Returns:
+        np.ndarray: Shape (n, max_goals, max_goals); entry [f, i, j] is the
+        probability of fixture f ending i - j.
+    """
+    home_pmf = poisson_pmf(lambda_home, max_goals)
+    away_pmf = poisson_pmf(lambda_away, max_goals)
+    return home_pmf[:, :, None] * away_pmf[:, None, :]
+
+
+def grid_markets(matrices):
+    """
+    Market probabilities for a stack of score matrices in one vectorised pass.
+
+    Args:
+        matrices (np.ndarray): Shape (n, G, G), e.g. from score_matrices.
+
+    Returns:
+        dict: Arrays of shape (n,) for "home_win", "draw", "away_win",
+        "over_1_5", "over_2_5" and "btts" (normalised by each grid's mass),
+        plus "home_goals"/"away_goals" of the most likely score.
+    """
+    n, size, _ = matrices.shape
+    goals = np.arange(size)
+    diff = np.subtract.outer(goals, goals)
+    total_goals = np.add.outer(goals, goals)
+    totals = matrices.sum(axis=(1, 2))
+    totals = np.where(totals > 0, totals, 1.0)
+
+    def share(mask):
+        return np.tensordot(matrices, mask.astype(float), axes=([1, 2], [0, 1])) / totals
+
+    best = matrices.reshape(n, -1).argmax(axis=1)
+    return {
+        "home_win": share(diff > 0),
+        "draw": share(diff == 0),
+        "away_win": share(diff < 0),
+        "over_1_5": share(total_goals > 1.5),
+        "over_2_5": share(total_goals > 2.5),
+        "btts": share((goals[:, None] >= 1) & (goals[None, :] >= 1)),
+        "home_goals": best // size,
+        "away_goals": best % size
+    }
+
+
+class ScoreGrid:
+    """
+    Joint score distribution for one fixture, built once as the outer product
+    of two Poisson PMF vectors. Every market is an array reduction over the
+    same matrix. Probabilities are normalised by the mass the grid captures,
+    which is what the previous loop-based implementation did.
+    """
+    def __init__(self, lambda_home, lambda_away, max_goals=DEFAULT_MAX_GOALS, matrix=None):
+        """
+        Args:
+            lambda_home (float): Expected home goals.
+            lambda_away (float): Expected away goals.
+            max_goals (int): Goals per side covered by the grid.
+            matrix (np.ndarray): Optional precomputed matrix (e.g. one slice
+                of score_matrices) to wrap instead of recomputing it.
+        """
+        self.lambda_home = float(lambda_home)
+        self.lambda_away = float(lambda_away)
+        if matrix is None:
+            matrix = np.outer(poisson_pmf(lambda_home, max_goals), poisson_pmf(lambda_away, max_goals))
+        self.matrix = matrix
+        self.max_goals = matrix.shape[0]
+        self.total = float(matrix.sum())
+
+        goals = np.arange(self.max_goals)
+        self._diff = np.subtract.outer(goals, goals)
+        self._sum = np.add.outer(goals, goals)
+
+    @property
+    def truncated_mass(self):
+        """Probability mass falling outside the grid."""
+        return max(0.0, 1.0 - self.total)
+
+    def _share(self, mask):
+        if self.total <= 0:
+            return 0.0
+        return float(self.matrix[mask].sum() / self.total)
+
+    def outcome_probabilities(self):
+        """
+        Returns:
+            tuple: (home_win, draw, away_win) probabilities.
+        """
+        return (
+            self._share(self._diff > 0),
+            self._share(self._diff == 0),
+            self._share(self._diff < 0)
+        )
+
+    def over(self, line):
+        """Probability that total goals exceed ``line`` (e.g. 2.5)."""
+        return self._share(self._sum > line)
+
+    def under(self, line):
+        """Probability that total goals stay below ``line``."""
+        return self._share(self._sum < line)
+
+    def btts(self):
+        """Probability that both teams score."""
+        if self.total <= 0:
+            return 0.0
+        return float(self.matrix[1:, 1:].sum() / self.total)
+
+    def exact_score(self, home_goals, away_goals):
+        """Probability of a specific final score."""
+        if home_goals >= self.max_goals or away_goals >= self.max_goals or self.total <= 0:
+            return 0.0
+        return float(self.matrix[home_goals, away_goals] / self.total)
+
+    def most_likely_score(self):
+        """
+        Returns:
+            tuple: (home_goals, away_goals) of the most probable score.
+        """
+        i, j = np.unravel_index(np.argmax(self.matrix), self.matrix.shape)
+        return int(i), int(j)
+
+    def asian_handicap(self, line):
+        """
+        Settlement probabilities for the home side at an Asian handicap.
+
+        Args:
+            line (float): Handicap added to the home score, in steps of 0.25
+                (e.g. -0.5, -0.75, +1). Quarter lines are settled as two
+                half stakes on the neighbouring half/whole lines.
+
+        Returns:
+            dict: Probabilities of "win", "half_win", "push", "half_loss"
+            and "loss" for a home bet.
+        """
+        # A quarter line is two half stakes on line - 0.25 and line + 0.25;
+        # whole and half lines are the degenerate case where both match.
+        if (line * 4) % 2 == 1:
+            low, high = line - 0.25, line + 0.25
+        else:
+            low = high = line
+        settle = np.sign(self._diff + low) + np.sign(self._diff + high)
+        return {
+            "win": self._share(settle == 2),
+            "half_win": self._share(settle == 1),
+            "push": self._share(settle == 0),
+            "half_loss": self._share(settle == -1),
+            "loss": self._share(settle == -2)
+        }
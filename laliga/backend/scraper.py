@@ -1,8 +1,15 @@
 import os
+import gzip
 import json
 import time
-import random
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
+from schedule_parser import extract_schedule_rows
+from match_columns import write_columns, read_columns
+from match_ndjson import SeasonWriter, iter_matches, write_json_array
+from metrics import REGISTRY, inc, observe
 
 # Dependencies
 try:
@@ -15,8 +22,9 @@ except ImportError:
 try:
     import requests
 except ImportError:
-    print("requests not installed. Please install it.")
-    exit(1)
+    # Raised rather than exiting: the API imports this module lazily from a
+    # refresh thread, which has to be able to report the failure
+    raise ImportError("requests not installed. Please install it.")
 
 # Constants
 BASE_URL_TEMPLATE = "https://fbref.com/en/comps/12/{season}/schedule/{season}-La-Liga-Scores-and-Fixtures"
@@ -24,8 +32,112 @@ BASE_URL_TEMPLATE = "https://fbref.com/en/comps/12/{season}/schedule/{season}-La
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 HTML_DIR = os.path.join(PROJECT_ROOT, 'src/data/html')
 OUTPUT_JSON_FILE = os.path.join(PROJECT_ROOT, 'src/data/matches-all-seasons.json')
+# Parsed matches per season, keyed by the hash of the HTML they came from
+PARSED_CACHE_DIR = os.path.join(PROJECT_ROOT, 'src/data/parsed')
+# Bump when parse_html_content changes its output so cached seasons are re-parsed
+PARSER_VERSION = 2
 START_YEAR = 2014
 END_YEAR = 2024
+# Be nice when scraping: at most one page request per this many seconds
+FETCH_INTERVAL_SECONDS = 3
+# Give up on a page request after this long and fall back to the saved page
+FETCH_TIMEOUT_SECONDS = 30
+# Most recent seasons that can still change; with revalidate=True their
+# saved pages are checked against fbref (older seasons are final)
+LIVE_SEASONS = 1
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available,
+    so concurrent fetchers share one request rate instead of each sleeping.
+    """
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# Shared by every network fetch made from this process
+fetch_limiter = TokenBucket(rate=1 / FETCH_INTERVAL_SECONDS)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    The HTTP session shared by every fetch in this process, so seasons
+    reuse its pooled keep-alive connections (and cloudscraper's challenge
+    cookies) instead of each opening a new one. Falls back to a plain
+    requests session without cloudscraper, e.g. against a local server.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            if HAS_CLOUDSCRAPER:
+                # cloudscraper mounts its own pooled HTTPS adapter; keep it
+                _session = cloudscraper.create_scraper()
+            else:
+                _session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=4)
+                _session.mount('http://', adapter)
+                _session.mount('https://', adapter)
+        return _session
+
+def fetch_page(url, validators=None):
+    """
+    GETs a page through the shared session, conditionally if validators
+    from an earlier response are given.
+
+    Args:
+        url (str): Page URL.
+        validators (dict): "etag" and/or "last_modified" of the saved copy,
+            sent as If-None-Match / If-Modified-Since.
+
+    Returns:
+        tuple: (status, content, validators). content is the page text on a
+        200 and None otherwise; validators are the ones to store with the
+        page (the old ones on a 304).
+    """
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    fetch_limiter.acquire()
+    print(f"Fetching {url}{' (conditional)' if headers else ''}...")
+    try:
+        resp = get_session().get(url, headers=headers, timeout=FETCH_TIMEOUT_SECONDS)
+    except requests.RequestException:
+        inc('laliga_scraper_fetches_total', status='error')
+        raise
+    inc('laliga_scraper_fetches_total', status=str(resp.status_code))
+
+    fresh = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+    fresh = {key: value for key, value in fresh.items() if value}
+    if resp.status_code == 304:
+        return 304, None, {**(validators or {}), **fresh}
+    if resp.status_code != 200:
+        return resp.status_code, None, None
+    return 200, resp.text, fresh
 
 def seed_random(seed_str):
     h = 0
@@ -38,51 +150,76 @@ def seed_random(seed_str):
         return state / 4294967296.0
     return rng
 
-def parse_html_content(content, season_str):
+def _extract_rows_bs4(content):
+    """
+    BeautifulSoup fallback for extract_schedule_rows, with the same output.
+    """
     soup = BeautifulSoup(content, 'html.parser')
     # Remove comments just in case
     text = str(soup).replace('<!--', '').replace('-->', '')
     soup = BeautifulSoup(text, 'html.parser')
     
     table = soup.find('table', id=lambda x: x and 'sched' in x)
-    if not table:
+    if not table or not table.find('tbody'):
+        return None
+
+    rows = []
+    for row in table.find('tbody').find_all('tr'):
+        cells = {}
+        # One pass over the row's cells; the first per (tag, data-stat) wins
+        for cell in row.find_all(['td', 'th'], attrs={'data-stat': True}):
+            key = (cell.name, cell['data-stat'])
+            if key not in cells:
+                cells[key] = cell.get_text(strip=True)
+        rows.append((row.get('class', []), cells))
+    return rows
+
+def parse_html_content(content, season_str, backend='auto'):
+    """
+    Parses the matches out of an fbref "Scores & Fixtures" page.
+
+    Args:
+        content (str): Page HTML.
+        season_str (str): Season such as "2024-2025", used for match ids.
+        backend (str): "fast" for the single-pass html.parser scanner,
+            "bs4" for BeautifulSoup, or "auto" to try the fast scanner and
+            fall back to BeautifulSoup when it finds no schedule table.
+    """
+    rows = None
+    if backend in ('auto', 'fast'):
+        rows = extract_schedule_rows(content)
+    if rows is None and backend in ('auto', 'bs4'):
+        rows = _extract_rows_bs4(content)
+    if not rows:
         return []
 
-    rows = table.find('tbody').find_all('tr')
     matches = []
     match_count = 0
     
-    for row in rows:
-        if 'thead' in row.get('class', []):
-            continue
-            
-        date_cell = row.find('td', {'data-stat': 'date'})
-        home_team_cell = row.find('td', {'data-stat': 'home_team'})
-        away_team_cell = row.find('td', {'data-stat': 'away_team'})
-        score_cell = row.find('td', {'data-stat': 'score'})
-        time_cell = row.find('td', {'data-stat': 'start_time'})
-        venue_cell = row.find('td', {'data-stat': 'venue'})
-        gameweek_header = row.find('th', {'data-stat': 'gameweek'})
-        
-        if not date_cell or not home_team_cell or not away_team_cell:
+    for classes, cells in rows:
+        if 'thead' in classes:
             continue
             
-        date = date_cell.get_text(strip=True)
-        home_team = home_team_cell.get_text(strip=True)
-        away_team = away_team_cell.get_text(strip=True)
+        date = cells.get(('td', 'date'))
+        home_team = cells.get(('td', 'home_team'))
+        away_team = cells.get(('td', 'away_team'))
+        score_cell = cells.get(('td', 'score'))
+        time_cell = cells.get(('td', 'start_time'))
+        venue_cell = cells.get(('td', 'venue'))
+        gameweek_header = cells.get(('th', 'gameweek'))
         
-        # Skip empty rows
+        # Skip rows with missing or empty cells
         if not date or not home_team or not away_team:
             continue
 
-        match_time = time_cell.get_text(strip=True).replace(' ', '') if time_cell else "21:00"
+        match_time = time_cell.replace(' ', '') if time_cell is not None else "21:00"
         match_time = match_time[:5] if len(match_time) >= 5 else "21:00"
         
-        venue = venue_cell.get_text(strip=True) if venue_cell else "Generic Stadium"
-        matchday_str = gameweek_header.get_text(strip=True) if gameweek_header else "0"
+        venue = venue_cell if venue_cell is not None else "Generic Stadium"
+        matchday_str = gameweek_header if gameweek_header is not None else "0"
         matchday = int(matchday_str) if matchday_str.isdigit() else 0
         
-        score_text = score_cell.get_text(strip=True) if score_cell else ""
+        score_text = score_cell if score_cell is not None else ""
         
         home_score = 0
         away_score = 0
@@ -136,74 +273,293 @@ def parse_html_content(content, season_str):
             "time": match_time,
             "stadium": venue,
             "matchday": matchday,
-            "season": season_str
+            "season": season_str,
+            # Fixtures not played yet keep a 0-0 score; this tells them apart
+            "played": has_score
         })
         match_count += 1
         
     return matches
 
-def fetch_season(year_start):
+def page_path(season_str):
+    # Where fetched pages are saved; gzip cuts the ~1 MB pages roughly 10x
+    return os.path.join(HTML_DIR, f"{season_str}.html.gz")
+
+def local_page_path(season_str):
+    """
+    The saved page for a season, compressed or a plain .html saved by
+    hand, or None if there is none.
+    """
+    for path in (page_path(season_str), os.path.join(HTML_DIR, f"{season_str}.html")):
+        if os.path.exists(path):
+            return path
+    return None
+
+def read_page(path):
+    """
+    Returns:
+        tuple: (content, source_hash) of a saved page. The hash is over the
+        uncompressed bytes, so a page keeps its hash (and its parsed cache)
+        when it moves from .html to .html.gz.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith('.gz'):
+        raw = gzip.decompress(raw)
+    # Same newline handling as reading the file in text mode
+    content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    return content, hashlib.sha1(raw).hexdigest()
+
+def _validators_path(season_str):
+    return os.path.join(HTML_DIR, f"{season_str}.validators.json")
+
+def load_validators(season_str):
+    """ETag / Last-Modified stored with a season's saved page, or None."""
+    try:
+        with open(_validators_path(season_str), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_validators(season_str, validators):
+    path = _validators_path(season_str)
+    if validators:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(validators, f)
+    elif os.path.exists(path):
+        # A page saved without validators must not be validated with old ones
+        os.remove(path)
+
+def save_page(season_str, content, validators=None):
+    """
+    Saves a fetched page compressed, with the validators of the response
+    it came from, replacing any plain .html copy.
+
+    Returns:
+        str: Hash of the page (see read_page).
+    """
+    raw = content.encode('utf-8')
+    os.makedirs(HTML_DIR, exist_ok=True)
+    path = page_path(season_str)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # mtime=0 keeps the file identical for identical pages
+    with open(tmp_path, 'wb') as f:
+        f.write(gzip.compress(raw, mtime=0))
+    os.replace(tmp_path, path)
+    plain_path = os.path.join(HTML_DIR, f"{season_str}.html")
+    if os.path.exists(plain_path):
+        os.remove(plain_path)
+
+    _save_validators(season_str, validators)
+    return hashlib.sha1(raw).hexdigest()
+
+def load_parsed_season(season_str, source_hash):
+    """
+    Returns the cached matches for a season if they were parsed from HTML
+    with the given hash by the current parser, otherwise None.
+    """
+    cache_path = os.path.join(PARSED_CACHE_DIR, f"{season_str}.json")
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('source_hash') != source_hash or cached.get('parser_version') != PARSER_VERSION:
+        return None
+    return cached['matches']
+
+def save_parsed_season(season_str, source_hash, matches):
+    try:
+        os.makedirs(PARSED_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(PARSED_CACHE_DIR, f"{season_str}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "source_hash": source_hash,
+                "parser_version": PARSER_VERSION,
+                "matches": matches
+            }, f)
+    except OSError as e:
+        print(f"Could not cache parsed {season_str}: {e}")
+
+def fetch_season(year_start, incremental=False, revalidate=False):
+    """
+    Returns the matches of one season, from the saved page if present,
+    otherwise by scraping. With incremental=True a season whose page hash
+    matches the parsed cache is returned without re-parsing. With
+    revalidate=True a saved page is checked against fbref first
+    (conditional GET) and replaced if the server has a newer one.
+    """
+    matches, _ = _fetch_season(year_start, incremental, revalidate)
+    return matches
+
+def _fetch_season(year_start, incremental=False, revalidate=False):
+    # Returns (matches, changed) where changed is False for a parsed-cache hit
+    if revalidate:
+        return _download_season(year_start, incremental)
+    local = _load_local_season(year_start, incremental)
+    if local is not None:
+        return local
+    return _download_season(year_start, incremental)
+
+def _load_local_season(year_start, incremental=False):
+    # (matches, changed) from the saved page, or None if there is none
     year_end = year_start + 1
     season_str = f"{year_start}-{year_end}"
     
     # 1. Try local file first
-    local_path = os.path.join(HTML_DIR, f"{season_str}.html")
-    if os.path.exists(local_path):
-        print(f"Reading local file for {season_str}...")
-        with open(local_path, 'r', encoding='utf-8') as f:
-            return parse_html_content(f.read(), season_str)
+    local_path = local_page_path(season_str)
+    if local_path is None:
+        return None
+    content, source_hash = read_page(local_path)
+    if incremental:
+        cached = load_parsed_season(season_str, source_hash)
+        if cached is not None:
+            print(f"{season_str} unchanged, using parsed cache...")
+            return cached, False
+    print(f"Reading local file for {season_str}...")
+    matches = parse_html_content(content, season_str)
+    save_parsed_season(season_str, source_hash, matches)
+    return matches, True
+
+def _download_season(year_start, incremental=False):
+    year_end = year_start + 1
+    season_str = f"{year_start}-{year_end}"
+    local_path = local_page_path(season_str)
+    # Without a saved page there is nothing to validate against
+    validators = load_validators(season_str) if local_path else None
 
     # 2. Try scraping
     url = BASE_URL_TEMPLATE.format(season=season_str)
-    print(f"Fetching {url}...")
     
     try:
-        content = ""
-        if HAS_CLOUDSCRAPER:
-            scraper = cloudscraper.create_scraper()
-            resp = scraper.get(url)
-            if resp.status_code == 200:
-                content = resp.text
-            else:
-                print(f"Failed to fetch {season_str} (Status {resp.status_code}).")
-        else:
-            print("Skipping download (cloudscraper missing).")
+        status, content, validators = fetch_page(url, validators)
+        if status == 304:
+            # Saved page is current: its parsed cache is reused as is
+            print(f"{season_str} not modified on the server.")
+            _save_validators(season_str, validators)
+            return _load_local_season(year_start, incremental=True)
+        if status != 200:
+            print(f"Failed to fetch {season_str} (Status {status}).")
             
         if content:
             matches = parse_html_content(content, season_str)
             if matches:
-                 # Save HTML for future
-                 os.makedirs(HTML_DIR, exist_ok=True)
-                 with open(local_path, 'w', encoding='utf-8') as f:
-                     f.write(content)
-                 return matches
+                 # Save page for future
+                 source_hash = save_page(season_str, content, validators)
+                 if load_parsed_season(season_str, source_hash) is not None:
+                     # Server sent the page again but it hasn't changed
+                     print(f"{season_str} unchanged, using parsed cache...")
+                     return matches, False
+                 save_parsed_season(season_str, source_hash, matches)
+                 return matches, True
             else:
                 print(f"No match table found in fetched content for {season_str}.")
     except Exception as e:
         print(f"Error fetching {season_str}: {e}")
 
+    if local_path:
+        # Keep serving the saved page when revalidating it failed
+        return _load_local_season(year_start, incremental)
     print(f"Could not load data for {season_str}. Please manually save the page to laliga/src/data/html/{season_str}.html")
-    return []
+    return [], True
+
+def _timed(fn, *args):
+    # Runs inside pool workers too, so the duration travels back with the result
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def _collect_parallel(years, incremental, workers, live_years=()):
+    # Saved pages are parsed across a process pool; missing and live ones are
+    # fetched from threads that share fetch_limiter and the session.
+    # Yields (year, (matches, changed), seconds) as seasons finish.
+    local_years = [y for y in years if y not in live_years and local_page_path(f"{y}-{y+1}") is not None]
+    remote_years = [y for y in years if y not in local_years]
+    with ProcessPoolExecutor(max_workers=workers) as parsers, ThreadPoolExecutor(max_workers=workers) as fetchers:
+        futures = {parsers.submit(_timed, _fetch_season, y, incremental): y for y in local_years}
+        futures.update({fetchers.submit(_timed, _download_season, y, incremental): y for y in remote_years})
+        for future in as_completed(futures):
+            yield (futures.pop(future),) + future.result()
+
+def _collect_sequential(years, incremental, live_years=()):
+    for year in years:
+        yield (year,) + _timed(_fetch_season, year, incremental, year in live_years)
+
+def main(incremental=False, workers=1, revalidate=False):
+    """
+    Collects every season into OUTPUT_JSON_FILE.
+
+    Each season is written to its own NDJSON file (see match_ndjson) as soon
+    as it is parsed and then dropped, so memory doesn't grow with the
+    number of seasons. The JSON array and the columnar copy are then
+    streamed from those files.
 
-def main():
+    Args:
+        incremental (bool): Only re-parse seasons whose HTML changed since
+            the last run (normally just the live one) and merge them with
+            the cached parses of the rest. The JSON file is left untouched
+            when no season changed.
+        workers (int): Processes used to parse saved seasons in parallel.
+            Output is identical to a sequential run: seasons are always
+            merged in year order.
+        revalidate (bool): Check the saved pages of the LIVE_SEASONS most
+            recent seasons against fbref with a conditional GET. A 304
+            keeps the saved page and its parse.
+
+    Returns:
+        list: Seasons that were (re-)parsed or fetched.
+    """
     print(f"Starting data collection {START_YEAR} to {END_YEAR}...")
-    all_matches = []
-    
-    for year in range(START_YEAR, END_YEAR + 1):
-        matches = fetch_season(year)
-        all_matches.extend(matches)
-        print(f"Got {len(matches)} matches for {year}-{year+1}")
-        # Be nice if scraping
-        if not os.path.exists(os.path.join(HTML_DIR, f"{year}-{year+1}.html")):
-            time.sleep(3)
-
-    print(f"Saving {len(all_matches)} total matches to {OUTPUT_JSON_FILE}...")
+    run_start = time.perf_counter()
+    years = list(range(START_YEAR, END_YEAR + 1))
+    live_years = set(years[-LIVE_SEASONS:]) if revalidate and LIVE_SEASONS else set()
+    if workers and workers > 1:
+        seasons = _collect_parallel(years, incremental, workers, live_years)
+    else:
+        seasons = _collect_sequential(years, incremental, live_years)
+
+    changed_seasons = []
+    total = 0
+    os.makedirs(os.path.dirname(OUTPUT_JSON_FILE), exist_ok=True)
+    with SeasonWriter(OUTPUT_JSON_FILE) as writer:
+        for year, (matches, changed), seconds in seasons:
+            season_str = f"{year}-{year+1}"
+            writer.write_season(season_str, matches)
+            total += len(matches)
+            if changed:
+                changed_seasons.append(season_str)
+            REGISTRY.set('laliga_scraper_season_seconds', seconds, season=season_str)
+            inc('laliga_scraper_seasons_total', result='failed' if not matches else 'parsed' if changed else 'cached')
+            print(f"Got {len(matches)} matches for {season_str} ({seconds:.2f}s)")
+    changed_seasons.sort()
+
+    if incremental and not changed_seasons and os.path.exists(OUTPUT_JSON_FILE):
+        print("No season changed, keeping existing data file.")
+        if read_columns(OUTPUT_JSON_FILE) is None:
+            write_columns(iter_matches(OUTPUT_JSON_FILE), OUTPUT_JSON_FILE, count=total)
+        observe('laliga_scraper_run_seconds', time.perf_counter() - run_start)
+        return changed_seasons
+
+    print(f"Saving {total} total matches to {OUTPUT_JSON_FILE}...")
     try:
-        os.makedirs(os.path.dirname(OUTPUT_JSON_FILE), exist_ok=True)
-        with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f:
-            json.dump(all_matches, f, indent=2)
+        write_json_array(iter_matches(OUTPUT_JSON_FILE), OUTPUT_JSON_FILE)
+        # Compact memory-mappable copy the engine loads instead of the JSON
+        write_columns(iter_matches(OUTPUT_JSON_FILE), OUTPUT_JSON_FILE, count=total)
     except Exception as e:
         print(f"Error saving JSON: {e}")
+    observe('laliga_scraper_run_seconds', time.perf_counter() - run_start)
+    return changed_seasons
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Collect LaLiga fixtures from fbref")
+    parser.add_argument("--incremental", action="store_true", help="only re-parse seasons whose HTML changed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes used to parse seasons")
+    parser.add_argument("--revalidate", action="store_true", help="check the live season's saved page against fbref")
+    parser.add_argument("--base-url", help="page URL template with a {season} placeholder (e.g. a local mirror)")
+    args = parser.parse_args()
+    if args.base_url:
+        BASE_URL_TEMPLATE = args.base_url
+    main(incremental=args.incremental, workers=args.workers, revalidate=args.revalidate)
@@ -0,0 +1,208 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from team_windows import Window
+
+DEFAULT_SIMULATIONS = 10000
+# Seasons simulated per task. Each chunk has its own seed, so results only
+# depend on the seed and the number of simulations, not on the worker count.
+SIMULATION_CHUNK = 2000
+# Final-table zones reported per team
+TOP_SPOTS = 4 # Champions League
+RELEGATION_SPOTS = 3
+
+
+class SeasonSimulator:
+    """
+    Monte Carlo simulation of a season's final table.
+
+    Results already played are kept as they are. Every remaining fixture
+    is drawn from independent Poisson distributions using the engine's
+    per-fixture lambdas, for many seasons at once (a fixtures x simulations
+    array of goals). Each simulated table is ranked with LaLiga's
+    tiebreakers: points, then head-to-head points and goal difference
+    among the tied teams, then overall goal difference and goals scored.
+    """
+    def __init__(self, engine, season=None, as_of=None):
+        """
+        Args:
+            engine (PredictionEngine): Supplies the matches and the lambdas.
+            season (str): Season to simulate, e.g. "2024-2025". Defaults to
+                the latest season in the dataset.
+            as_of (str | date): Treat matches from this date on as not yet
+                played (and keep them out of the lambdas), to replay a
+                season from a past point. Defaults to the actual results.
+        """
+        if not engine.store:
+            raise ValueError("No match data loaded")
+        df = engine.store.df
+        if season is None:
+            season = df['season'].max()
+        matches = df[df['season'] == season]
+        if matches.empty:
+            raise ValueError(f"Unknown season: {season}")
+
+        self.season = season
+        self.window = Window(as_of=as_of)
+        self.teams = sorted(set(matches['homeTeam']) | set(matches['awayTeam']))
+        team_ids = {team: i for i, team in enumerate(self.teams)}
+        home = matches['homeTeam'].map(team_ids).to_numpy()
+        away = matches['awayTeam'].map(team_ids).to_numpy()
+
+        done = matches['played'].to_numpy(dtype=bool, copy=True)
+        if self.window.as_of is not None:
+            done &= (matches['date'] < self.window.as_of).to_numpy()
+
+        # Score matrices indexed [home, away]; one match per ordered pair
+        n = len(self.teams)
+        self.scheduled = np.zeros((n, n), dtype=bool)
+        self.scheduled[home, away] = True
+        self.home_goals = np.zeros((n, n), dtype=np.int32)
+        self.away_goals = np.zeros((n, n), dtype=np.int32)
+        self.home_goals[home[done], away[done]] = matches['homeScore'].to_numpy()[done]
+        self.away_goals[home[done], away[done]] = matches['awayScore'].to_numpy()[done]
+
+        self.remaining_home = home[~done]
+        self.remaining_away = away[~done]
+        fixtures = [(self.teams[h], self.teams[a]) for h, a in zip(self.remaining_home, self.remaining_away)]
+        if fixtures:
+            self.lambda_home, self.lambda_away = engine.fixture_lambdas(fixtures, self.window)
+        else:
+            self.lambda_home = self.lambda_away = np.zeros(0)
+
+    def run(self, n_sims=DEFAULT_SIMULATIONS, seed=0, workers=1):
+        """
+        Simulates the rest of the season ``n_sims`` times.
+
+        Args:
+            n_sims (int): Number of seasons to sample.
+            seed (int): Seed for the random draws; the same seed and n_sims
+                always give the same result.
+            workers (int): Processes to spread the chunks over.
+
+        Returns:
+            dict: Per-team current points, expected points and position,
+            title / top-4 / relegation probabilities (in %) and the full
+            distribution of final positions.
+        """
+        chunks = [SIMULATION_CHUNK] * (n_sims // SIMULATION_CHUNK)
+        if n_sims % SIMULATION_CHUNK:
+            chunks.append(n_sims % SIMULATION_CHUNK)
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        tasks = [(self.home_goals, self.away_goals, self.scheduled, self.remaining_home,
+                  self.remaining_away, self.lambda_home, self.lambda_away, size, chunk_seed)
+                 for size, chunk_seed in zip(chunks, seeds)]
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                parts = list(pool.map(_simulate_chunk, tasks))
+        else:
+            parts = [_simulate_chunk(task) for task in tasks]
+
+        n = len(self.teams)
+        position_counts = np.zeros((n, n), dtype=np.int64)
+        points_total = np.zeros(n)
+        for counts, points in parts:
+            position_counts += counts
+            points_total += points
+        return self._summary(position_counts, points_total, n_sims, seed)
+
+    def _summary(self, position_counts, points_total, n_sims, seed):
+        n = len(self.teams)
+        share = position_counts / n_sims
+        current = _table(self.home_goals[None], self.away_goals[None],
+                         self.scheduled & ~self._remaining_mask())
+        rows = []
+        for i, team in enumerate(self.teams):
+            rows.append({
+                "team": team,
+                "played": int(current["played"][0, i]),
+                "points": int(current["points"][0, i]),
+                "expected_points": round(float(points_total[i] / n_sims), 2),
+                "expected_position": round(float((share[i] * np.arange(1, n + 1)).sum()), 2),
+                "title": round(float(share[i, 0]) * 100, 1),
+                "top_4": round(float(share[i, :TOP_SPOTS].sum()) * 100, 1),
+                "relegation": round(float(share[i, n - RELEGATION_SPOTS:].sum()) * 100, 1),
+                "positions": [round(float(p) * 100, 2) for p in share[i]]
+            })
+        rows.sort(key=lambda row: row["expected_position"])
+        return {
+            "season": self.season,
+            "as_of": self.window.to_dict()["as_of"],
+            "simulations": n_sims,
+            "seed": seed,
+            "remaining_fixtures": int(len(self.remaining_home)),
+            "table": rows
+        }
+
+    def _remaining_mask(self):
+        mask = np.zeros_like(self.scheduled)
+        mask[self.remaining_home, self.remaining_away] = True
+        return mask
+
+
+def _table(home_goals, away_goals, counted):
+    """
+    League tables for a stack of seasons.
+
+    Args:
+        home_goals, away_goals (np.ndarray): Shape (sims, teams, teams);
+            [s, h, a] is the score of h at home to a in simulation s.
+        counted (np.ndarray): (teams, teams) mask of the matches to count.
+
+    Returns:
+        dict: (sims, teams) arrays "points", "played", "goal_diff",
+        "goals_for", plus the (sims, teams, teams) head-to-head matrices
+        "points_vs" and "goal_diff_vs" ([s, i, j] is from i's side vs j).
+    """
+    home_points = np.where(counted, 3 * (home_goals > away_goals) + (home_goals == away_goals), 0)
+    away_points = np.where(counted, 3 * (away_goals > home_goals) + (home_goals == away_goals), 0)
+    points_vs = home_points + away_points.transpose(0, 2, 1)
+    goals_vs = np.where(counted, home_goals, 0) + np.where(counted, away_goals, 0).transpose(0, 2, 1)
+    goal_diff_vs = goals_vs - goals_vs.transpose(0, 2, 1)
+    goals_for = goals_vs.sum(axis=2)
+    return {
+        "points": points_vs.sum(axis=2),
+        "played": np.broadcast_to(counted.sum(axis=1) + counted.sum(axis=0), goals_for.shape),
+        "goal_diff": goals_for - goals_vs.sum(axis=1),
+        "goals_for": goals_for,
+        "points_vs": points_vs,
+        "goal_diff_vs": goal_diff_vs
+    }
+
+
+def rank_tables(table):
+    """
+    Final positions (0 = champion) for a stack of tables from _table.
+
+    Teams level on points are separated by a head-to-head mini-league
+    between all of them (points, then goal difference), then by overall
+    goal difference and goals scored.
+    """
+    points = table["points"]
+    tied = points[:, :, None] == points[:, None, :]
+    h2h_points = (table["points_vs"] * tied).sum(axis=2)
+    h2h_goal_diff = (table["goal_diff_vs"] * tied).sum(axis=2)
+    # lexsort sorts by the last key first
+    order = np.lexsort((-table["goals_for"], -table["goal_diff"], -h2h_goal_diff, -h2h_points, -points))
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.broadcast_to(np.arange(order.shape[1]), order.shape), axis=1)
+    return positions
+
+
+def _simulate_chunk(task):
+    (home_goals, away_goals, scheduled, remaining_home, remaining_away,
+     lambda_home, lambda_away, n_sims, seed) = task
+    rng = np.random.default_rng(seed)
+    n = len(scheduled)
+
+    home_goals = np.repeat(home_goals[None], n_sims, axis=0)
+    away_goals = np.repeat(away_goals[None], n_sims, axis=0)
+    if len(remaining_home):
+        # fixtures x simulations draws, written into every simulated season
+        home_goals[:, remaining_home, remaining_away] = rng.poisson(lambda_home[:, None], (len(lambda_home), n_sims)).T
+        away_goals[:, remaining_home, remaining_away] = rng.poisson(lambda_away[:, None], (len(lambda_away), n_sims)).T
+
+    table = _table(home_goals, away_goals, scheduled)
+    positions = rank_tables(table)
+    counts = np.bincount((np.arange(n) * n + positions).ravel(), minlength=n * n).reshape(n, n)
+    return counts, table["points"].sum(axis=0).astype(float)
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+import numpy as np
+
+# Words dropped when comparing names, so "Valencia CF" and "Celta de Vigo"
+# match "Valencia" and "Celta Vigo"
+CLUB_AFFIXES = frozenset(('fc', 'cf', 'cd', 'ud', 'sd', 'rcd', 'rc', 'ca', 'sad', 'club', 'de', 'del'))
+# Other spellings of the scraped names (the values). Accents, case and the
+# affixes above are ignored on both sides, so only real variants go here.
+TEAM_ALIASES = {
+    "Athletic Bilbao": "Athletic Club",
+    "Athletic": "Athletic Club",
+    "Atlético": "Atlético Madrid",
+    "Atleti": "Atlético Madrid",
+    "Real Betis": "Betis",
+    "Real Betis Balompié": "Betis",
+    "Celta": "Celta Vigo",
+    "Deportivo Alavés": "Alavés",
+    "Deportivo La Coruña": "La Coruña",
+    "Deportivo": "La Coruña",
+    "Rayo": "Rayo Vallecano",
+    "Rayo Vallecano de Madrid": "Rayo Vallecano",
+    "Sporting": "Sporting Gijón",
+    "Real Valladolid": "Valladolid",
+    "Real Mallorca": "Mallorca",
+    "Real Sociedad de Fútbol": "Real Sociedad",
+    "Barça": "Barcelona",
+}
+
+
+def clean_team_name(name):
+    """
+    Collapses newlines and repeated whitespace found in scraped team names.
+    """
+    return ' '.join(str(name).split())
+
+
+def name_key(name):
+    """
+    Loose comparison key for a team name: no accents, lower case, no
+    punctuation or club affixes ("Atlético de Madrid" -> "atletico madrid").
+    """
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii').casefold()
+    return ' '.join(word for word in re.split(r'[^a-z0-9]+', text) if word and word not in CLUB_AFFIXES)
+
+
+class TeamRegistry:
+    """
+    Canonical team names for one dataset, with integer ids.
+
+    Ids are positions in the sorted name list, so they are stable for a
+    given data version and index straight into per-team arrays. A name
+    from a request is resolved with one dict lookup when it's already
+    canonical, and otherwise through its name_key, which also covers the
+    TEAM_ALIASES variants.
+    """
+    def __init__(self, names, aliases=TEAM_ALIASES):
+        """
+        Args:
+            names (iterable): Team names as found in the data (duplicates,
+                untidy whitespace and aliases are fine).
+            aliases (dict): Variant -> canonical name.
+        """
+        alias_keys = {name_key(alias): target for alias, target in aliases.items()}
+        canonical = set()
+        for name in names:
+            if name is None or not clean_team_name(name):
+                continue
+            canonical.add(alias_keys.get(name_key(name), clean_team_name(name)))
+
+        self.names = tuple(sorted(canonical))
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self._keys = {name_key(name): i for i, name in enumerate(self.names)}
+        for key, target in alias_keys.items():
+            if target in self._ids:
+                self._keys.setdefault(key, self._ids[target])
+
+    def id(self, name):
+        """
+        Returns:
+            int | None: Id of the team ``name`` refers to, None if unknown.
+        """
+        i = self._ids.get(name)
+        if i is None and name is not None:
+            i = self._keys.get(name_key(name))
+        return i
+
+    def ids(self, names):
+        """Ids for many names as an int64 array; -1 for unknown names."""
+        cache = {}
+        out = np.empty(len(names), dtype=np.int64)
+        for pos, name in enumerate(names):
+            i = cache.get(name)
+            if i is None:
+                i = cache[name] = self.id(name)
+                if i is None:
+                    i = cache[name] = -1
+            out[pos] = i
+        return out
+
+    def resolve(self, name):
+        """
+        Canonical spelling of ``name``, or the cleaned name itself if it
+        isn't a known team.
+        """
+        i = self.id(name)
+        return self.names[i] if i is not None else clean_team_name(name)
+
+    def __contains__(self, name):
+        return self.id(name) is not None
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,240 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Per-window aggregate tables kept by TeamWindowIndex.aggregate_table
+WINDOW_CACHE_SIZE = 128
+
+# Cumulative counters kept per team; window totals are differences of two entries
+CUMULATIVE_FIELDS = (
+    'played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+    'home_played', 'home_goals_for', 'home_goals_against',
+    'away_played', 'away_goals_for', 'away_goals_against'
+)
+
+
+class Window:
+    """
+    Selects which matches the models look at.
+
+    Args:
+        as_of (str | date): Only matches played strictly before this date.
+        season_from (str): First season included, e.g. "2022-2023".
+        season_to (str): Last season included.
+        last_n (int): Only each team's most recent N matches inside the
+            date/season range (a rolling window).
+    """
+    def __init__(self, as_of=None, season_from=None, season_to=None, last_n=None):
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of is not None else None
+        self.season_from = season_from
+        self.season_to = season_to
+        self.last_n = last_n
+
+    @property
+    def is_full(self):
+        """True if the window covers the whole dataset."""
+        return self.key() == (None, None, None, None)
+
+    def key(self):
+        as_of = self.as_of.date().isoformat() if self.as_of is not None else None
+        return (as_of, self.season_from, self.season_to, self.last_n)
+
+    def with_last_n(self, last_n):
+        """Same date/season range with a different rolling window."""
+        window = Window(None, self.season_from, self.season_to, last_n)
+        window.as_of = self.as_of
+        return window
+
+    def to_dict(self):
+        as_of, season_from, season_to, last_n = self.key()
+        return {"as_of": as_of, "season_from": season_from, "season_to": season_to, "last_n": last_n}
+
+    def __repr__(self):
+        return f"Window({self.to_dict()})"
+
+
+FULL_WINDOW = Window()
+
+
+class TeamWindowIndex:
+    """
+    Per-team, date-sorted match arrays with cumulative sums, indexed by
+    team id.
+
+    Every team's matches sit in one contiguous, oldest-first segment of
+    flat arrays ([offsets[id], offsets[id + 1])). Any window (as-of date,
+    season range, last N) maps to a [start, end) slice of that segment
+    found with a binary search, and its totals are the difference of two
+    cumulative-sum entries, so aggregates for a window cost O(log n)
+    regardless of its size.
+    """
+    def __init__(self, home, away, home_goals, away_goals, dates, seasons=None, played=None, team_names=None):
+        """
+        Args:
+            home, away (array): Team id per match (positions in
+                ``team_names``), or team names when ``team_names`` is None;
+                ids then follow the sorted names.
+            home_goals, away_goals (array): Final score per match.
+            dates (array): Match dates (datetime64; NaT sorts first).
+            seasons (array): Season strings per match, needed for season windows.
+            played (array): Optional bool mask; matches where it is False
+                (fixtures not played yet) are left out of the index.
+            team_names (sequence): Name of every team id, e.g. a
+                TeamRegistry's names.
+        """
+        if team_names is None:
+            team_names, codes = np.unique(np.concatenate([np.asarray(home, dtype=object),
+                                                          np.asarray(away, dtype=object)]), return_inverse=True)
+            home, away = np.split(codes, 2)
+        self.team_names = tuple(team_names)
+        home = np.asarray(home, dtype=np.int64)
+        away = np.asarray(away, dtype=np.int64)
+        home_goals = np.asarray(home_goals, dtype=np.int64)
+        away_goals = np.asarray(away_goals, dtype=np.int64)
+        day = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        n = len(home)
+        n_teams = len(self.team_names)
+
+        self.has_seasons = seasons is not None
+        if self.has_seasons:
+            seasons = np.asarray(seasons, dtype=object)
+            self.season_names = sorted(set(seasons))
+            codes = {name: i for i, name in enumerate(self.season_names)}
+            season_code = np.array([codes[s] for s in seasons], dtype=np.int64)
+        else:
+            season_code = np.zeros(n, dtype=np.int64)
+
+        # Oldest first; ties keep file order once reversed (newest first)
+        order = np.lexsort((-np.arange(n), day))
+        if played is not None:
+            order = order[np.asarray(played, dtype=bool)[order]]
+        m = len(order)
+
+        # Both sides of every match, grouped by team id, oldest first within a team
+        teams = np.concatenate([home[order], away[order]])
+        positions = np.concatenate([order, order])
+        is_home = np.concatenate([np.ones(m, dtype=bool), np.zeros(m, dtype=bool)])
+        rank = np.concatenate([np.arange(m), np.arange(m)])
+        grouped = np.lexsort((rank, teams))
+        self.offsets = np.zeros(n_teams + 1, dtype=np.int64)
+        np.cumsum(np.bincount(teams, minlength=n_teams), out=self.offsets[1:])
+
+        pos = positions[grouped]
+        home_side = is_home[grouped]
+        goals_for = np.where(home_side, home_goals[pos], away_goals[pos])
+        goals_against = np.where(home_side, away_goals[pos], home_goals[pos])
+        away_side = ~home_side
+        counters = {
+            'played': np.ones(len(pos), dtype=np.int64),
+            'wins': goals_for > goals_against,
+            'draws': goals_for == goals_against,
+            'losses': goals_for < goals_against,
+            'goals_for': goals_for,
+            'goals_against': goals_against,
+            'home_played': home_side,
+            'home_goals_for': goals_for * home_side,
+            'home_goals_against': goals_against * home_side,
+            'away_played': away_side,
+            'away_goals_for': goals_for * away_side,
+            'away_goals_against': goals_against * away_side,
+        }
+        # One running sum over all segments: differences inside a segment
+        # are still that team's totals
+        self.cumulative = np.zeros((len(CUMULATIVE_FIELDS), len(pos) + 1), dtype=np.int64)
+        for row, field in enumerate(CUMULATIVE_FIELDS):
+            np.cumsum(counters[field], out=self.cumulative[row, 1:])
+        self.positions = pos
+        self.is_home = home_side
+        self.goals_for = goals_for
+        self.goals_against = goals_against
+        self.days = day[pos]
+        self.season_codes = season_code[pos]
+
+        self._window_tables = OrderedDict()
+        # The index is shared by every pool thread through the store
+        self._window_lock = threading.Lock()
+
+    def bounds(self, team_id, window=None):
+        """
+        Returns:
+            tuple: (start, end) slice of the flat arrays selected by
+            ``window`` inside the team's segment, or None for an unknown id.
+        """
+        if team_id is None or not 0 <= team_id < len(self.team_names):
+            return None
+        window = window or FULL_WINDOW
+        first, last = int(self.offsets[team_id]), int(self.offsets[team_id + 1])
+        start, end = first, last
+        if window.as_of is not None:
+            as_of = np.datetime64(window.as_of.date(), 'D').astype(np.int64)
+            end = first + int(np.searchsorted(self.days[first:last], as_of, side='left'))
+        if window.season_from is not None or window.season_to is not None:
+            if not self.has_seasons:
+                raise ValueError("Season windows need a season column in the data")
+            codes = self.season_codes[first:last]
+            if window.season_from is not None:
+                code = int(np.searchsorted(self.season_names, window.season_from, side='left'))
+                start = max(start, first + int(np.searchsorted(codes, code, side='left')))
+            if window.season_to is not None:
+                code = int(np.searchsorted(self.season_names, window.season_to, side='right'))
+                end = min(end, first + int(np.searchsorted(codes, code, side='left')))
+        end = max(start, end)
+        if window.last_n is not None:
+            start = max(start, end - window.last_n)
+        return start, end
+
+    def aggregate(self, team_id, window=None):
+        """
+        Totals (played, wins, goals, home/away splits...) for a team over a window.
+
+        Returns:
+            dict | None: CUMULATIVE_FIELDS -> int, or None for an unknown id.
+        """
+        span = self.bounds(team_id, window)
+        if span is None:
+            return None
+        totals = self.cumulative[:, span[1]] - self.cumulative[:, span[0]]
+        return dict(zip(CUMULATIVE_FIELDS, totals.tolist()))
+
+    def aggregate_table(self, window=None):
+        """
+        Window totals for every team, cached per window.
+
+        Returns:
+            np.ndarray: int64 array of shape (teams, len(CUMULATIVE_FIELDS));
+            row i holds the totals of team id i (zeros if it has no matches
+            in the window).
+        """
+        window = window or FULL_WINDOW
+        key = window.key()
+        with self._window_lock:
+            table = self._window_tables.get(key)
+            if table is not None:
+                self._window_tables.move_to_end(key)
+                return table
+
+        spans = np.array([self.bounds(i, window) for i in range(len(self.team_names))],
+                         dtype=np.int64).reshape(-1, 2)
+        table = (self.cumulative[:, spans[:, 1]] - self.cumulative[:, spans[:, 0]]).T
+        with self._window_lock:
+            self._window_tables[key] = table
+            if len(self._window_tables) > WINDOW_CACHE_SIZE:
+                self._window_tables.popitem(last=False)
+        return table
+
+    def recent(self, team_id, last_n, window=None):
+        """
+        The team's last ``last_n`` matches inside ``window``, newest first.
+
+        Returns:
+            dict | None: Arrays "positions", "is_home", "goals_for",
+            "goals_against", or None for an unknown id.
+        """
+        window = (window or FULL_WINDOW).with_last_n(last_n)
+        span = self.bounds(team_id, window)
+        if span is None:
+            return None
+        start, end = span
+        return {key: getattr(self, key)[start:end][::-1]
+                for key in ("positions", "is_home", "goals_for", "goals_against")}
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import scraper
+
+# Season served by the stand-in server
+SEASON_YEAR = 2024
+SEASON = f"{SEASON_YEAR}-{SEASON_YEAR + 1}"
+
+# Minimal fbref-style schedule page: two played matches and one fixture
+PAGE = f"""<html><body>
+<table id="sched_{SEASON}_12_1"><tbody>
+<tr><th data-stat="gameweek">1</th><td data-stat="date">2024-08-15</td><td data-stat="start_time">19:00</td>
+<td data-stat="home_team">Athletic Club</td><td data-stat="score">1&ndash;1</td><td data-stat="away_team">Getafe</td>
+<td data-stat="venue">San Mam&eacute;s</td></tr>
+<tr><th data-stat="gameweek">1</th><td data-stat="date">2024-08-15</td><td data-stat="start_time">21:30</td>
+<td data-stat="home_team">Betis</td><td data-stat="score">1&ndash;1</td><td data-stat="away_team">Girona</td>
+<td data-stat="venue">Estadio Benito Villamar&iacute;n</td></tr>
+<tr class="thead"><th data-stat="gameweek">Wk</th></tr>
+<tr><th data-stat="gameweek">2</th><td data-stat="date">2024-08-25</td><td data-stat="start_time">21:30</td>
+<td data-stat="home_team">Real Madrid</td><td data-stat="score"></td><td data-stat="away_team">Valladolid</td>
+<td data-stat="venue">Estadio Santiago Bernab&eacute;u</td></tr>
+</tbody></table>
+</body></html>""".encode('utf-8')
+
+
+def make_handler(page, requests_seen):
+    etag = '"%s"' % hashlib.sha1(page).hexdigest()
+
+    class Handler(BaseHTTPRequestHandler):
+        # Stand-in for fbref: serves one page and honours If-None-Match
+        def do_GET(self):
+            requests_seen.append(dict(self.headers))
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', 'Sat, 01 Mar 2025 10:00:00 GMT')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def test_conditional_fetch():
+    requests_seen = []
+    server = HTTPServer(('127.0.0.1', 0), make_handler(PAGE, requests_seen))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix='laliga-fetch-')
+    names = ('HTML_DIR', 'PARSED_CACHE_DIR', 'OUTPUT_JSON_FILE', 'BASE_URL_TEMPLATE', 'START_YEAR', 'END_YEAR',
+             'fetch_limiter')
+    saved = {name: getattr(scraper, name) for name in names}
+    try:
+        scraper.HTML_DIR = os.path.join(workdir, 'html')
+        scraper.PARSED_CACHE_DIR = os.path.join(workdir, 'parsed')
+        scraper.OUTPUT_JSON_FILE = os.path.join(workdir, 'matches.json')
+        scraper.BASE_URL_TEMPLATE = f"http://127.0.0.1:{server.server_port}/{{season}}"
+        scraper.START_YEAR = scraper.END_YEAR = SEASON_YEAR
+        scraper.fetch_limiter = scraper.TokenBucket(rate=1000)
+
+        # No saved page: plain GET, page stored compressed with its validators
+        assert scraper.main(incremental=True, revalidate=True) == [SEASON]
+        assert 'If-None-Match' not in requests_seen[0]
+        assert scraper.local_page_path(SEASON).endswith('.html.gz')
+        assert scraper.load_validators(SEASON)['etag']
+
+        # Saved page: conditional GET, the 304 keeps the page and its parse
+        assert scraper.main(incremental=True, revalidate=True) == []
+        assert requests_seen[1].get('If-None-Match') == scraper.load_validators(SEASON)['etag']
+        assert requests_seen[1].get('If-Modified-Since') == 'Sat, 01 Mar 2025 10:00:00 GMT'
+        assert len(requests_seen) == 2
+        assert len(scraper.fetch_season(SEASON_YEAR, incremental=True)) == 3
+    finally:
+        for name, value in saved.items():
+            setattr(scraper, name, value)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_conditional_fetch()
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from metrics import inc
+
+
+class Overloaded(Exception):
+    """
+    Raised when an endpoint already has as many calls running and queued
+    as it allows; the API answers it with HTTP 429.
+    """
+    def __init__(self, endpoint, retry_after=1):
+        super().__init__(f"Too many concurrent {endpoint} requests, retry later")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class WorkPool:
+    """
+    Threads for CPU-bound request work, kept apart from the event loop and
+    from Starlette's default threadpool. Each endpoint gets its own
+    EndpointLimiter with its own threads, so a slow call on one endpoint
+    never sits in front of another endpoint's queue. numpy/pandas release
+    the GIL in their inner loops, so the threads overlap well without
+    copying the engine into other processes.
+    """
+    def __init__(self):
+        self.limiters = {}
+
+    def limiter(self, endpoint, max_running, max_queued):
+        """
+        Creates (or returns) the limiter for ``endpoint``.
+
+        Args:
+            endpoint (str): Name used in errors and metrics.
+            max_running (int): Calls of this endpoint running at once (its
+                number of threads).
+            max_queued (int): Calls allowed to wait for a slot; any more
+                are rejected with Overloaded.
+        """
+        if endpoint not in self.limiters:
+            self.limiters[endpoint] = EndpointLimiter(self, endpoint, max_running, max_queued)
+        return self.limiters[endpoint]
+
+    def shutdown(self):
+        for limiter in self.limiters.values():
+            limiter.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EndpointLimiter:
+    """
+    One endpoint's threads plus its queue limit. Calls beyond max_running
+    wait in the endpoint's own executor queue. Only touched from the event
+    loop, so the counter needs no lock.
+    """
+    def __init__(self, pool, endpoint, max_running, max_queued):
+        self.pool = pool
+        self.endpoint = endpoint
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.pending = 0 # running + waiting
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix=f"laliga-{endpoint}")
+
+    def full(self):
+        return self.pending >= self.max_running + self.max_queued
+
+    async def run(self, fn, *args, admitted=False):
+        """
+        Runs ``fn(*args)`` on one of this endpoint's threads once one is
+        free and returns its result.
+
+        Args:
+            admitted (bool): Skip the queue limit, for follow-up work of a
+                request that was already let in (e.g. later chunks of a
+                streamed batch).
+
+        Raises:
+            Overloaded: If the endpoint's queue is full.
+        """
+        if not admitted and self.full():
+            inc('laliga_rejected_requests_total', endpoint=self.endpoint)
+            raise Overloaded(self.endpoint)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+        finally:
+            self.pending -= 1
+
+    def status(self):
+        return {"pending": self.pending, "max_running": self.max_running, "max_queued": self.max_queued}